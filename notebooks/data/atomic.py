@@ -0,0 +1,18 @@
+import json
+import os
+
+
+def save_json_atomic(path, data, indent=None):
+    """
+    Write a JSON file through a temporary file moved into place, so a crash never leaves half a file.
+
+    Args:
+        path (str): Path of the JSON file; its folder is created if needed.
+        data: The value to write.
+        indent (int, optional): Indentation, as for json.dump. Defaults to None (compact).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=indent)
+    os.replace(temp_path, path)
@@ -0,0 +1,229 @@
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from loading import load_snapshots
+from replay import ReplayServer, fixtures_from_snapshots
+from scraper import YouTubeDataScraper
+from writers import format_row
+
+try:
+    # Peak resident memory is read from getrusage, which only exists on Unix.
+    import resource
+except ImportError:
+    resource = None
+
+
+def read_snapshot_rows(folder_path):
+    """
+    Read the data rows of every snapshot CSV in a folder, without the header.
+
+    Args:
+        folder_path (str): Folder holding the snapshot CSV files (normally output/).
+
+    Returns:
+        list: One list of field values per video row.
+    """
+    rows = []
+    for name in sorted(os.listdir(folder_path)):
+        if not name.endswith(".csv"):
+            continue
+        with open(os.path.join(folder_path, name), encoding="utf-8", newline="") as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            rows.extend(reader)
+    return rows
+
+
+def legacy_prepare_feature(feature):
+    # The string munging the scraper used before: strip newlines and quotes, then wrap in quotes by hand.
+    for ch in ['\n', '"']:
+        feature = str(feature).replace(ch, "")
+    return f'"{feature}"'
+
+
+def legacy_serialize(rows, file, page_size=50):
+    # The old path: prepare every field, join the fields with commas and write one line at a time.
+    for row in rows:
+        file.write(",".join([legacy_prepare_feature(feature) for feature in row]) + "\n")
+
+
+def csv_writer_serialize(rows, file, page_size=50):
+    # csv.writer in the QUOTE_ALL dialect, with one writerows call per page of 50 videos.
+    writer = csv.writer(file, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    for start in range(0, len(rows), page_size):
+        writer.writerows(rows[start:start + page_size])
+
+
+def page_serialize(rows, file, page_size=50):
+    # The scraper's current path: format_row for every row and one write call per page.
+    for start in range(0, len(rows), page_size):
+        file.write("".join([format_row(row) for row in rows[start:start + page_size]]))
+
+
+def benchmark_serializers(folder_path, repeat=3):
+    """
+    Compare rows per second of the old string munging, csv.writer and the scraper's page serializer.
+
+    Args:
+        folder_path (str): Folder holding the snapshot CSV files.
+        repeat (int, optional): Number of timed runs per serializer; the best one is kept. Defaults to 3.
+
+    Returns:
+        dict: Rows per second of each serializer, whether the page serializer writes the same bytes as
+        csv.writer, and whether its output reads back unchanged.
+    """
+    rows = read_snapshot_rows(folder_path)
+    results = {"rows": len(rows)}
+    serializers = (("legacy", legacy_serialize), ("csv_writer", csv_writer_serialize), ("page", page_serialize))
+    for name, serialize in serializers:
+        best = float("inf")
+        for _ in range(repeat):
+            buffer = io.StringIO()
+            started = time.perf_counter()
+            serialize(rows, buffer)
+            best = min(best, time.perf_counter() - started)
+        results[f"{name}_rows_per_sec"] = round(len(rows) / best)
+
+    # The page serializer must match csv.writer byte for byte and read back to exactly the same fields.
+    expected, actual = io.StringIO(newline=""), io.StringIO(newline="")
+    csv_writer_serialize(rows, expected)
+    page_serialize(rows, actual)
+    results["page_matches_csv_writer"] = actual.getvalue() == expected.getvalue()
+    actual.seek(0)
+    results["page_lossless"] = list(csv.reader(actual)) == rows
+    return results
+
+
+def legacy_load(file_paths):
+    # The old elist: one default pd.read_csv per file, in turn, gathered in a dict of "df0", "df1"... and concatenated.
+    frames = {f"df{i}": pd.read_csv(file_path) for i, file_path in enumerate(file_paths)}
+    return pd.concat(frames.values(), axis=0)
+
+
+def benchmark_loading(folder_path, max_workers=None, repeat=3):
+    """
+    Compare the old file-by-file loading of the snapshots with the parallel, typed loader.
+
+    Args:
+        folder_path (str): Folder holding the snapshot CSV files.
+        max_workers (int, optional): Reader processes of the typed loader. Defaults to the CPU count.
+        repeat (int, optional): Number of timed runs per loader; the best one is kept. Defaults to 3.
+
+    Returns:
+        dict: Seconds, in-memory size (MiB) and number of object columns of each loader's DataFrame.
+    """
+    # Region files only; shared video tables ("{date}_videos.csv") have no country code.
+    file_paths = [os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path))
+                  if name.endswith(".csv") and not name.split("_")[1].startswith("videos")]
+    results = {"files": len(file_paths)}
+    for name, load in (("legacy", legacy_load), ("typed", lambda paths: load_snapshots(paths, None, max_workers))):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = load(file_paths)
+            best = min(best, time.perf_counter() - started)
+        results[name] = {"seconds": round(best, 3), "rows": len(data),
+                         "memory_mb": round(float(data.memory_usage(deep=True).sum()) / 2 ** 20, 1),
+                         "object_columns": int((data.dtypes == object).sum())}
+    return results
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process so far, in MiB (ru_maxrss is in KiB on Linux).
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def benchmark_replay(fixtures_dir, max_workers=4, latency=0.05, error_rate=0.0, output_format="csv",
+                     field_mask=True):
+    """
+    Run YouTubeDataScraper.get_data end to end against the local replay server.
+
+    Args:
+        fixtures_dir (str): Folder of recorded (or generated) pages, one sub-folder per region.
+        max_workers (int, optional): Regions scraped at the same time. Defaults to 4.
+        latency (float, optional): Seconds the server waits before each answer. Defaults to 0.05.
+        error_rate (float, optional): Share of requests answered with HTTP 429. Defaults to 0.
+        output_format (str, optional): "csv" or "parquet". Defaults to "csv".
+        field_mask (bool, optional): Send the `fields` mask. Defaults to True.
+
+    Returns:
+        dict: Wall time, pages/sec, rows/sec, rate limited answers, peak RSS and the scraper stats
+        (bytes and decode time per page) of the run.
+    """
+    regions = sorted(os.listdir(fixtures_dir))
+    with tempfile.TemporaryDirectory() as work_dir, \
+            ReplayServer(fixtures_dir, latency=latency, error_rate=error_rate) as server:
+        # The scraper reads its key and regions from files, so write throwaway ones.
+        api_key_path = os.path.join(work_dir, "api_key.txt")
+        country_code_path = os.path.join(work_dir, "country_codes.txt")
+        with open(api_key_path, "w") as file:
+            file.write("replay-key\n")
+        with open(country_code_path, "w") as file:
+            file.write("\n".join(regions))
+
+        scraper = YouTubeDataScraper(api_key_path, country_code_path, os.path.join(work_dir, "output"),
+                                     max_workers=max_workers, state_dir=os.path.join(work_dir, "state"),
+                                     cache_ttl=0, output_format=output_format, api_base=server.api_base,
+                                     field_mask=field_mask)
+        started = time.perf_counter()
+        scraper.get_data()
+        elapsed = time.perf_counter() - started
+
+        rows = sum(scraper.checkpoints.get(region).get("rows_written", 0) for region in regions)
+        return {
+            "regions": len(regions),
+            "pages": server.stats["pages"],
+            "rows": rows,
+            "rate_limited": server.stats["rate_limited"],
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(server.stats["pages"] / elapsed, 1),
+            "rows_per_sec": round(rows / elapsed, 1),
+            "peak_rss_mb": peak_rss_mb(),
+            "scraper": scraper.stats_report(),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the YouTube trending scraper")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    serializers = subparsers.add_parser("serializers", help="Compare row serializers on the output/ snapshots")
+    serializers.add_argument("--output-dir", default=os.path.join("..", "..", "output"))
+    serializers.add_argument("--repeat", type=int, default=3)
+
+    loading = subparsers.add_parser("loading", help="Compare the old and the typed loading of the output/ snapshots")
+    loading.add_argument("--output-dir", default=os.path.join("..", "..", "output"))
+    loading.add_argument("--workers", type=int, default=None)
+    loading.add_argument("--repeat", type=int, default=3)
+
+    fixtures = subparsers.add_parser("fixtures", help="Build replay fixtures from the output/ snapshots")
+    fixtures.add_argument("--output-dir", default=os.path.join("..", "..", "output"))
+    fixtures.add_argument("--fixtures-dir", default="fixtures")
+    fixtures.add_argument("--date", default=None, help="Trending date (yy.dd.mm); defaults to the latest one")
+
+    replay = subparsers.add_parser("replay", help="Run get_data end to end against the replay server")
+    replay.add_argument("--fixtures-dir", default="fixtures")
+    replay.add_argument("--workers", type=int, default=4)
+    replay.add_argument("--latency", type=float, default=0.05)
+    replay.add_argument("--error-rate", type=float, default=0.0)
+    replay.add_argument("--output-format", choices=["csv", "parquet"], default="csv")
+    replay.add_argument("--no-field-mask", dest="field_mask", action="store_false")
+
+    args = parser.parse_args()
+    if args.benchmark == "serializers":
+        print(benchmark_serializers(args.output_dir, args.repeat))
+    elif args.benchmark == "loading":
+        print(benchmark_loading(args.output_dir, args.workers, args.repeat))
+    elif args.benchmark == "fixtures":
+        print(f"Fixtures written for {fixtures_from_snapshots(args.output_dir, args.fixtures_dir, args.date)}")
+    elif args.benchmark == "replay":
+        print(benchmark_replay(args.fixtures_dir, args.workers, args.latency, args.error_rate, args.output_format,
+                               args.field_mask))
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from atomic import save_json_atomic
+
+
+class ResponseCache:
+    """
+    An on-disk cache of API responses with ETag revalidation.
+
+    Requests are keyed on (endpoint, region, page token, date bucket). Bodies are stored once under
+    the SHA-256 of their content, so identical pages share one file, and an index maps each request
+    key to its body, ETag and timestamps.
+
+    - Within `ttl` seconds of being stored, an entry is served straight from disk (no request, no quota).
+    - After that, the stored ETag is sent as If-None-Match and a 304 answer is served from disk.
+    - When the bodies take more than `max_bytes`, the least recently used entries are evicted.
+
+    The last-used times of cache hits are written to the index in batches of `save_every` hits (and with
+    every stored or revalidated page, and by `save`), instead of rewriting the index on every hit.
+    """
+
+    def __init__(self, cache_dir, ttl=6 * 3600, max_bytes=256 * 1024 * 1024, save_every=50):
+        # Folder holding the index and the content-addressed bodies.
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        # Seconds an entry is served without asking the server.
+        self.ttl = ttl
+        # Largest total size of the stored bodies.
+        self.max_bytes = max_bytes
+        # Number of hits whose last-used time may wait in memory before the index is written.
+        self.save_every = save_every
+        self.unsaved_hits = 0
+        # Concurrent regions share the cache, so the index is guarded by a lock.
+        self.lock = threading.Lock()
+        self.index = self.load_index()
+
+    def load_index(self):
+        # Read the index left by earlier runs, if any.
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def save_index(self):
+        save_json_atomic(self.index_path, self.index)
+        self.unsaved_hits = 0
+
+    def save(self):
+        """Write the last-used times of the hits not saved yet, such as at the end of a run."""
+        with self.lock:
+            if self.unsaved_hits:
+                self.save_index()
+
+    @staticmethod
+    def key(endpoint, region, page_token, date_bucket):
+        """Build the cache key of a request."""
+        return hashlib.sha256(f"{endpoint}|{region}|{page_token or ''}|{date_bucket}".encode("utf-8")).hexdigest()
+
+    def object_path(self, digest):
+        # Bodies are spread over sub-folders named after the first two characters of their hash.
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json")
+
+    def get(self, key):
+        """
+        Look a request up in the cache.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            dict or None: The index entry (with "etag" and "fresh" flags), or None on a miss.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or not os.path.exists(self.object_path(entry["digest"])):
+                return None
+            return dict(entry, fresh=time.time() - entry["stored_at"] < self.ttl)
+
+    def read(self, key):
+        """
+        Return the stored body of a request and mark the entry as recently used.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            bytes or None: The body, or None if the entry was evicted since it was looked up (another
+            region may have stored pages in between).
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+            try:
+                with open(self.object_path(entry["digest"]), "rb") as file:
+                    body = file.read()
+            except FileNotFoundError:
+                return None
+            entry["last_used"] = time.time()
+            self.unsaved_hits += 1
+            if self.unsaved_hits >= self.save_every:
+                self.save_index()
+        return body
+
+    def revalidate(self, key):
+        """
+        Restart the time-to-live of an entry after the server answered 304 Not Modified.
+
+        Returns:
+            bool: False if the entry was evicted in the meantime.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                return False
+            entry["stored_at"] = time.time()
+            self.save_index()
+            return True
+
+    def put(self, key, body, etag=None):
+        """
+        Store the body of a successful response.
+
+        Args:
+            key (str): The cache key of the request.
+            body (bytes): The raw response body.
+            etag (str, optional): The ETag header of the response.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(body)
+                os.replace(temp_path, path)
+            now = time.time()
+            self.index[key] = {"digest": digest, "etag": etag, "size": len(body),
+                               "stored_at": now, "last_used": now}
+            self.evict()
+            self.save_index()
+
+    def evict(self):
+        # Drop the least recently used entries until the bodies fit in max_bytes; a body is only
+        # deleted once no entry refers to it any more. Called with the lock held.
+        sizes = {entry["digest"]: entry["size"] for entry in self.index.values()}
+        total = sum(sizes.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            del self.index[key]
+            if all(other["digest"] != entry["digest"] for other in self.index.values()):
+                total -= entry["size"]
+                path = self.object_path(entry["digest"])
+                if os.path.exists(path):
+                    os.remove(path)
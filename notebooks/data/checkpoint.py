@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+import time
+
+from atomic import save_json_atomic
+
+
+class CheckpointStore:
+    """
+    A small JSON journal recording how far the scrape of each region got on a given date.
+
+    For every region it keeps the status ("partial" or "done"), the `nextPageToken` of the next page
+    to fetch, how many rows were written and the size of the region file at that point. A restarted
+    run skips regions marked done and resumes partial ones from their token, after cutting the file
+    back to the recorded size in case rows were written after the last checkpoint.
+    """
+
+    def __init__(self, state_dir, date):
+        # One journal file per trending date.
+        self.path = os.path.join(state_dir, f"checkpoints_{date}.json")
+        # Concurrent regions update the same journal, so writes are serialized.
+        self.lock = threading.Lock()
+        self.entries = self.load()
+
+    def load(self):
+        # Read the journal left by an earlier run of the same day, if any.
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def get(self, country_code):
+        """Return the checkpoint of a region, or an empty dictionary if it was never started."""
+        with self.lock:
+            return dict(self.entries.get(country_code, {}))
+
+    def update(self, country_code, next_page_token, rows_written, bytes_written):
+        """
+        Record the progress of a region after one of its pages was written.
+
+        Args:
+            country_code (str): The region that made progress.
+            next_page_token (str or None): Token of the next page; None once the last page is written.
+            rows_written (int): Number of video rows written to the region file so far.
+            bytes_written (int): Size of the region file after those rows.
+        """
+        with self.lock:
+            self.entries[country_code] = {
+                "status": "done" if next_page_token is None else "partial",
+                "next_page_token": next_page_token,
+                "rows_written": rows_written,
+                "bytes_written": bytes_written,
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            self.save()
+
+    def reset(self):
+        """Forget every region of the date, so they are all scraped again."""
+        with self.lock:
+            self.entries = {}
+            self.save()
+
+    def save(self):
+        save_json_atomic(self.path, self.entries, indent=2)
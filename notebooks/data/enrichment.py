@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from atomic import save_json_atomic
+from quota import QuotaExhausted, QuotaScheduler
+from transport import TransportError
+
+
+class LruTtlCache:
+    """
+    A persistent key/value cache with a time-to-live and least-recently-used eviction.
+
+    Entries older than `ttl` seconds are treated as missing, and once more than `max_entries`
+    are stored the least recently used ones are dropped. The cache is kept in memory and saved
+    to a JSON file, so later runs start from what earlier runs resolved.
+    """
+
+    def __init__(self, path, ttl, max_entries=50000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.entries = OrderedDict(json.load(file))
+
+    def get(self, key, default=None):
+        """Return the value of a fresh entry, or `default` if it is missing or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry["stored_at"] > self.ttl:
+                return default
+            self.entries.move_to_end(key)
+            return entry["value"]
+
+    def __contains__(self, key):
+        marker = object()
+        return self.get(key, marker) is not marker
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries beyond `max_entries`."""
+        with self.lock:
+            self.entries[key] = {"value": value, "stored_at": time.time()}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self):
+        """Write the cache to its JSON file."""
+        with self.lock:
+            save_json_atomic(self.path, self.entries)
+
+
+class SnapshotEnricher:
+    """
+    Add the channel subscriber count and the category name to the rows of a trending snapshot.
+
+    Unseen channels are resolved through `channels.list`, 50 ids per call, and category names
+    through `videoCategories.list` once per region. Both are kept in persistent LRU/TTL caches,
+    so the same few hundred channels cost quota once a day rather than once per row.
+    """
+
+    # Largest number of ids the API accepts in one channels.list call.
+    batch_size = 50
+    columns = ["channel_subscriber_count", "category_name"]
+
+    def __init__(self, scraper, cache_dir, channel_ttl=24 * 3600, category_ttl=7 * 24 * 3600):
+        """
+        Args:
+            scraper (YouTubeDataScraper): Makes the API calls and provides the column positions.
+            cache_dir (str): Folder of the cache files.
+            channel_ttl (float, optional): Seconds a subscriber count is reused. Defaults to a day.
+            category_ttl (float, optional): Seconds category names are reused. Defaults to a week.
+        """
+        self.scraper = scraper
+        self.channels = LruTtlCache(os.path.join(cache_dir, "channels.json"), channel_ttl)
+        self.categories = LruTtlCache(os.path.join(cache_dir, "categories.json"), category_ttl)
+        # Concurrent regions often share channels; resolving one batch at a time avoids paying twice.
+        self.resolve_lock = threading.Lock()
+        self.channel_index = scraper.header.index("channelId")
+        self.category_index = scraper.header.index("categoryId")
+
+    def resolve_channels(self, country_code, channel_ids):
+        """
+        Make sure the subscriber count of every channel is cached, fetching the missing ones.
+
+        Args:
+            country_code (str): The region the calls are charged to.
+            channel_ids (iterable): Channel ids of a page.
+        """
+        with self.resolve_lock:
+            missing = [channel for channel in dict.fromkeys(channel_ids) if channel and channel not in self.channels]
+            for start in range(0, len(missing), self.batch_size):
+                batch = missing[start:start + self.batch_size]
+                params = {"part": "statistics", "id": ",".join(batch), "maxResults": self.batch_size}
+                if self.scraper.field_mask:
+                    params["fields"] = "items(id,statistics(subscriberCount,hiddenSubscriberCount))"
+                response = self.scraper.call_api("channels.list", f"{self.scraper.api_base}/channels", params,
+                                                 country_code, QuotaScheduler.PRIORITY_PAGE)
+                if response.status_code != 200:
+                    # An error answer says nothing about the channels, so nothing is cached and a later
+                    # page asks again; the rows of this page keep an empty subscriber count.
+                    print(f"channels.list answered HTTP {response.status_code} for {country_code}, "
+                          f"leaving {len(batch)} subscriber counts empty")
+                    continue
+                found = {item["id"]: item.get("statistics", {}).get("subscriberCount")
+                         for item in self.scraper.decode_response(response).get("items", [])}
+                # Channels that hide their count (or no longer exist) are cached as None, so they are not asked again.
+                for channel in batch:
+                    self.channels.put(channel, found.get(channel))
+
+    def category_names(self, country_code):
+        """
+        Return the category names of a region, fetching them once per region and TTL.
+
+        Args:
+            country_code (str): The region.
+
+        Returns:
+            dict: Category id to category name.
+        """
+        with self.resolve_lock:
+            names = self.categories.get(country_code)
+            if names is None:
+                params = {"part": "snippet", "regionCode": country_code}
+                if self.scraper.field_mask:
+                    params["fields"] = "items(id,snippet/title)"
+                response = self.scraper.call_api("videoCategories.list", f"{self.scraper.api_base}/videoCategories",
+                                                 params, country_code, QuotaScheduler.PRIORITY_REGION)
+                if response.status_code != 200:
+                    # Not cached, so the next page of the region asks again instead of keeping no names for days.
+                    print(f"videoCategories.list answered HTTP {response.status_code} for {country_code}, "
+                          f"leaving category names empty")
+                    return {}
+                names = {item["id"]: item.get("snippet", {}).get("title", "")
+                         for item in self.scraper.decode_response(response).get("items", [])}
+                self.categories.put(country_code, names)
+            return names
+
+    def enrich_rows(self, country_code, rows):
+        """
+        Append the subscriber count and category name to every row of a page.
+
+        Enrichment is optional, so a call that fails or runs out of quota leaves the fields empty instead of
+        stopping the region; the page itself is still written.
+
+        Args:
+            country_code (str): The region of the page.
+            rows (iterable): Rows of the page, as yielded by get_videos.
+
+        Returns:
+            list: The rows with the two extra fields.
+        """
+        rows = list(rows)
+        try:
+            self.resolve_channels(country_code, [row[self.channel_index] for row in rows])
+            names = self.category_names(country_code)
+        except (TransportError, QuotaExhausted) as error:
+            print(f"Could not enrich a page of {country_code}, leaving its extra fields empty: {error}")
+            names = {}
+        return [row + [self.channels.get(row[self.channel_index]), names.get(str(row[self.category_index]), "")]
+                for row in rows]
+
+    def save(self):
+        """Persist both caches."""
+        self.channels.save()
+        self.categories.save()
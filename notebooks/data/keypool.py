@@ -0,0 +1,155 @@
+import threading
+import time
+
+from quota import QuotaExhausted, QuotaScheduler
+
+
+class ApiKeyPool:
+    """
+    Spread API calls over several keys and keep track of the health of each one.
+
+    Keys are picked round-robin, or by most remaining quota, skipping keys that are cooling down.
+    A rate limited key (HTTP 429, or a 403 rate limit error) is put on cool-down for as long as the
+    Retry-After header asks, or `cooldown` seconds without one; when every key is cooling down, the
+    next call waits for the first one to come back, so rate limiting slows the scrape down instead of
+    stopping it. A key whose daily quota is spent (a 403 quota error, or its budget in the quota
+    scheduler) is left alone until the next run. Counters of calls, failures and cool-downs are kept
+    per key for the run report.
+    """
+
+    # Reasons of a 403 answer that mean the key, not the request, is the problem: the daily quota of the
+    # key is spent, or the key is sending too fast.
+    exhausted_reasons = ("quotaExceeded", "dailyLimitExceeded")
+    rate_limit_reasons = ("rateLimitExceeded", "userRateLimitExceeded")
+    quota_reasons = exhausted_reasons + rate_limit_reasons
+
+    def __init__(self, keys, scheduler, strategy="round_robin", cooldown=10):
+        """
+        Args:
+            keys (list): The API keys.
+            scheduler (QuotaScheduler): Tells how much quota each key has left.
+            strategy (str, optional): "round_robin" or "quota" (most remaining units first).
+            cooldown (float, optional): Seconds a rate limited key is skipped when the answer has no
+                Retry-After header. Defaults to 10 seconds.
+        """
+        if not keys:
+            raise ValueError("The key pool needs at least one API key")
+        if strategy not in ("round_robin", "quota"):
+            raise ValueError(f"strategy must be 'round_robin' or 'quota', not {strategy!r}")
+        self.keys = list(dict.fromkeys(keys))
+        self.scheduler = scheduler
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.next_index = 0
+        # Monotonic time until which each key is skipped.
+        self.cooling_until = {key: 0.0 for key in self.keys}
+        self.exhausted = set()
+        self.counters = {key: {"calls": 0, "failures": 0, "cooldowns": 0} for key in self.keys}
+
+    @classmethod
+    def from_file(cls, path, scheduler, **kwargs):
+        """Build a pool from a file holding one key per line (blank lines and # comments are skipped)."""
+        with open(path) as file:
+            keys = [line.strip() for line in file if line.strip() and not line.strip().startswith("#")]
+        return cls(keys, scheduler, **kwargs)
+
+    def available(self):
+        # Keys that are neither cooling down nor out of quota, in pool order. Called with the lock held.
+        now = time.monotonic()
+        return [key for key in self.keys if key not in self.exhausted and self.cooling_until[key] <= now]
+
+    def acquire(self, exclude=()):
+        """
+        Pick the key for the next call, waiting for a key to come back from cool-down if none is free.
+
+        Args:
+            exclude (iterable, optional): Keys not to use for this call. Defaults to ().
+
+        Returns:
+            str: An API key.
+
+        Raises:
+            QuotaExhausted: If every key (but the excluded ones) is out of quota.
+        """
+        while True:
+            with self.lock:
+                keys = [key for key in self.available() if key not in exclude]
+                if keys:
+                    return self.pick(keys)
+                waiting = [self.cooling_until[key] for key in self.keys
+                           if key not in self.exhausted and key not in exclude]
+                if not waiting:
+                    raise QuotaExhausted("Every API key is out of quota or keeps its reserve for higher priority calls")
+                delay = max(0.0, min(waiting) - time.monotonic())
+            print(f"Every API key is rate limited, waiting {delay:.1f}s for the first one to cool down")
+            time.sleep(delay)
+
+    def pick(self, keys):
+        # Choose among the available keys and count the call. Called with the lock held.
+        if self.strategy == "quota":
+            key = max(keys, key=self.scheduler.remaining)
+        else:
+            # Take the first available key at or after the round-robin position.
+            ordered = self.keys[self.next_index:] + self.keys[:self.next_index]
+            key = next(candidate for candidate in ordered if candidate in keys)
+            self.next_index = (self.keys.index(key) + 1) % len(self.keys)
+        self.counters[key]["calls"] += 1
+        return key
+
+    def mark_exhausted(self, key):
+        """Stop using a key whose daily budget is spent."""
+        with self.lock:
+            self.exhausted.add(key)
+
+    def error_reasons(self, response):
+        # Reasons listed in the error body of a 403 answer.
+        try:
+            return [error.get("reason") for error in response.json().get("error", {}).get("errors", [])]
+        except ValueError:
+            return []
+
+    def is_throttled(self, response):
+        """Tell whether a response means the key is rate limited or out of quota."""
+        if response is None:
+            return False
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return any(reason in self.quota_reasons for reason in self.error_reasons(response))
+
+    def report_failure(self, key, response=None, retry_after=None):
+        """
+        Record a failed call, and set the key aside if the failure came from throttling: out of quota
+        for the day, or on cool-down for `retry_after` seconds (`cooldown` when the server gave none).
+
+        Args:
+            key (str): The key the call was made with.
+            response (requests.Response, optional): The failed response, if any.
+            retry_after (float, optional): Seconds the server asked to wait (its Retry-After header).
+
+        Returns:
+            bool: True if the key was set aside, so the call is worth retrying with another key.
+        """
+        with self.lock:
+            self.counters[key]["failures"] += 1
+            if not self.is_throttled(response):
+                return False
+            if response.status_code == 403 and \
+                    any(reason in self.exhausted_reasons for reason in self.error_reasons(response)):
+                self.exhausted.add(key)
+                return True
+            self.counters[key]["cooldowns"] += 1
+            self.cooling_until[key] = time.monotonic() + (self.cooldown if retry_after is None else retry_after)
+            return True
+
+    def report(self):
+        """Return the counters of each key, under the key fingerprints used by the quota report."""
+        with self.lock:
+            now = time.monotonic()
+            return {QuotaScheduler.key_id(key): dict(self.counters[key],
+                                                     remaining=self.scheduler.remaining(key),
+                                                     cooling_down=self.cooling_until[key] > now,
+                                                     exhausted=key in self.exhausted)
+                    for key in self.keys}
@@ -0,0 +1,484 @@
+import csv
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from partitions import is_partitioned, iso_date, list_partitions
+from textstore import TextStore
+
+try:
+    # pyarrow parses CSV files several times faster than pandas and hands back typed columns.
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Explicit types of the snapshot columns, so no file has its types guessed: integer counts, boolean flags,
+# and categories for the repeated channel titles and category ids. Other columns are read as strings.
+count_columns = ["view_count", "likes", "dislikes", "comment_count", "channel_subscriber_count"]
+flag_columns = ["comments_disabled", "ratings_disabled"]
+category_columns = ["channelTitle", "channelId", "categoryId", "category_name"]
+# Timestamps are stored typed in Parquet snapshots and come back in the API's text format, as in CSV snapshots.
+timestamp_columns = ["publishedAt"]
+timestamp_format = "%Y-%m-%dT%H:%M:%SZ"
+
+# Snapshot file names: "{date}_{code}_videos.csv" for full region files, "{date}_{code}_ranks.csv" for
+# deduplicated region files and "{date}_videos.csv" for the shared video table of a date.
+snapshot_name = re.compile(r"^(?P<date>\d{2}\.\d{2}\.\d{2})_(?:(?P<code>[A-Z]{2})_)?(?P<kind>videos|ranks)"
+                           r"\.(?P<format>csv|parquet)$")
+# Long text fields that can be kept in the content-addressed text store, leaving a "{field}_hash" column.
+text_fields = ["description", "tags"]
+
+
+def arrow_type(name):
+    # Arrow type of a snapshot column.
+    if name in count_columns:
+        return pa.int64()
+    if name in flag_columns:
+        return pa.bool_()
+    if name in category_columns:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def pandas_dtype(name):
+    # pandas dtype of a snapshot column, for the fallback reader without pyarrow.
+    if name in count_columns:
+        return "Int64"
+    if name in flag_columns:
+        return "boolean"
+    if name in category_columns:
+        return "category"
+    return "string"
+
+
+def read_table(file_path, columns=None):
+    """
+    Read one region snapshot, CSV or Parquet, into an Arrow table with the snapshot types.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+
+    Returns:
+        pyarrow.Table: The snapshot, one column per requested name (missing columns are null).
+    """
+    if file_path.endswith(".parquet"):
+        table = pq.read_table(file_path, columns=[name for name in columns or [] if name in
+                                                  pq.read_schema(file_path).names] or None)
+        # Parquet snapshots are already typed; only the columns stored as plain strings become categories.
+        for index, field in enumerate(table.schema):
+            if field.name in category_columns and not pa.types.is_dictionary(field.type):
+                table = table.set_column(index, field.name, table.column(index).dictionary_encode())
+            elif field.name in timestamp_columns and pa.types.is_timestamp(field.type):
+                # Parquet keeps timestamps in milliseconds at least, which strftime would print with a fraction.
+                column = table.column(index).cast(pa.timestamp("s", tz="UTC"))
+                column = pa_compute.strftime(column, format=timestamp_format)
+                table = table.set_column(index, field.name, column)
+        for name in columns or []:
+            if name not in table.column_names:
+                table = table.append_column(name, pa.nulls(len(table), arrow_type(name)))
+        return table.select(columns) if columns else table
+
+    # The CSV header gives the column names, whose types are then pinned instead of inferred.
+    with open(file_path, encoding="utf-8", newline="") as file:
+        names = next(csv.reader(file), [])
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: arrow_type(name) for name in names + list(columns or [])},
+        include_columns=columns, include_missing_columns=True,
+        # Empty text stays an empty string, as in the files, while empty counts become nulls.
+        strings_can_be_null=False)
+    # Quoted descriptions may span several lines.
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+    return pa_csv.read_csv(file_path, parse_options=parse_options, convert_options=convert_options)
+
+
+def read_frame(file_path, columns=None):
+    """Read one region snapshot into a typed DataFrame, with pandas alone (used when pyarrow is missing)."""
+    if file_path.endswith(".parquet"):
+        data = pd.read_parquet(file_path)
+        for name in timestamp_columns:
+            if name in data.columns and pd.api.types.is_datetime64_any_dtype(data[name]):
+                data[name] = data[name].dt.strftime(timestamp_format)
+    else:
+        data = pd.read_csv(file_path, usecols=(lambda name: name in columns) if columns else None, dtype="string",
+                           keep_default_na=False)
+    # Requested columns the file does not have come back empty, as with the pyarrow reader.
+    return read_frame_types(data.reindex(columns=columns) if columns else data)
+
+
+def read_typed_frame(file_path, columns=None):
+    """Read one snapshot file into a DataFrame with the pinned snapshot types, whichever reader is available."""
+    if pa is None:
+        return read_frame(file_path, columns)
+    return read_table(file_path, columns).to_pandas()
+
+
+def read_frame_types(data):
+    # Give the columns of a DataFrame their snapshot dtypes.
+    return data.astype({name: pandas_dtype(name) for name in data.columns
+                        if name in count_columns + flag_columns + category_columns})
+
+
+def load_snapshots(file_paths, columns=None, max_workers=None):
+    """
+    Load region snapshots in parallel into one typed DataFrame.
+
+    Files are parsed on a pool of processes by the pyarrow CSV (or Parquet) reader with the explicit
+    snapshot types. The Arrow tables are concatenated without copying their buffers and converted to
+    pandas once, releasing each Arrow buffer as soon as it is converted, so the full dataset exists
+    in a single copy.
+
+    Args:
+        file_paths (list): Paths of the snapshot files.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+        max_workers (int, optional): Number of reader processes. Defaults to the CPU count; with one,
+            files are read in this process.
+
+    Returns:
+        pandas.DataFrame: The rows of every file, in the order of `file_paths`.
+    """
+    return tables_to_frame(read_tables(file_paths, columns, max_workers))
+
+
+def read_tables(file_paths, columns=None, max_workers=None):
+    """
+    Read region snapshots on a pool of processes.
+
+    Args:
+        file_paths (list): Paths of the snapshot files.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+        max_workers (int, optional): Number of reader processes. Defaults to the CPU count.
+
+    Returns:
+        list: One Arrow table per file (one DataFrame per file when pyarrow is not installed).
+    """
+    reader = read_table if pa is not None else read_frame
+    workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+    if workers <= 1:
+        return [reader(file_path, columns) for file_path in file_paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # A few files per task keep the cost of sending tables between processes low.
+        return list(executor.map(reader, file_paths, [columns] * len(file_paths),
+                                 chunksize=max(1, len(file_paths) // (workers * 4))))
+
+
+def frame_to_table(data):
+    """
+    Convert a DataFrame to an Arrow table with the snapshot types, so it can be concatenated with read_tables.
+
+    Args:
+        data (pandas.DataFrame): Snapshot rows, such as a deduplicated region joined with its video table.
+
+    Returns:
+        pyarrow.Table: The rows with the pinned types (the DataFrame itself when pyarrow is not installed).
+    """
+    if pa is None:
+        return read_frame_types(data)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    for index, name in enumerate(table.column_names):
+        column = table.column(index)
+        if not pa.types.is_dictionary(arrow_type(name)) or pa.types.is_string(column.type):
+            continue
+        # Types guessed by pandas (such as integer category ids) cannot be cast to a dictionary of strings
+        # directly, so they go through their plain values and strings first.
+        if pa.types.is_dictionary(column.type):
+            if pa.types.is_string(column.type.value_type):
+                continue
+            column = column.cast(column.type.value_type)
+        table = table.set_column(index, name, column.cast(pa.string()))
+    return table.cast(pa.schema([(name, arrow_type(name)) for name in table.column_names]))
+
+
+def tables_to_frame(tables):
+    """
+    Concatenate the tables of read_tables into one DataFrame.
+
+    Args:
+        tables (list): Arrow tables (or DataFrames when pyarrow is not installed).
+
+    Returns:
+        pandas.DataFrame: The concatenated rows.
+    """
+    if pa is None:
+        return pd.concat(tables, axis=0, ignore_index=True)
+    if not tables:
+        return pd.DataFrame()
+    # Concatenating Arrow tables only chains their chunks, and categories of different files are unified
+    # when converted.
+    table = pa.concat_tables(tables, promote_options="permissive")
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def parse_snapshot_name(file_path):
+    """
+    Split a snapshot file name into its parts.
+
+    Args:
+        file_path (str): Path or name of the file.
+
+    Returns:
+        dict or None: The "date", "code" (None for a shared video table), "kind" and "format"
+        of the file, or None if it is not a snapshot file.
+    """
+    match = snapshot_name.match(os.path.basename(file_path))
+    return match.groupdict() if match else None
+
+
+def snapshot_files(folder_path, start=None, end=None, regions=None):
+    """
+    List the region snapshots of a folder, keeping only the given dates and regions.
+
+    A folder can hold both layouts, such as flat history followed by hive runs, so both are listed.
+    In the partitioned layout, folders of other dates and regions are skipped without being opened.
+    In the flat layout the filters are applied to the file names. Shared video tables are left out,
+    and so is a flat file whose date and region also have a partition (a migrated copy of it).
+
+    Args:
+        folder_path (str): The output folder.
+        start (str, optional): First trending date to keep, as YYYY-MM-DD. Defaults to None.
+        end (str, optional): Last trending date to keep, as YYYY-MM-DD. Defaults to None.
+        regions (iterable, optional): Country codes to keep. Defaults to None (every region).
+
+    Returns:
+        list: (file path, country code) tuples, sorted by date and region.
+    """
+    files = list_partitions(folder_path, start, end, regions) if is_partitioned(folder_path) else []
+    partitioned = {(date, region) for date, region, _ in files}
+
+    regions = set(regions) if regions else None
+    for name in os.listdir(folder_path):
+        snapshot = parse_snapshot_name(name)
+        if snapshot is None or snapshot["code"] is None:
+            continue
+        date = iso_date(snapshot["date"])
+        if (start and date < start) or (end and date > end) or (regions and snapshot["code"] not in regions):
+            continue
+        if (date, snapshot["code"]) not in partitioned:
+            files.append((date, snapshot["code"], os.path.join(folder_path, name)))
+    return [(path, code) for _, code, path in sorted(files)]
+
+
+def snapshot_date(file_path):
+    # Trending date of a region snapshot as YYYY-MM-DD, from a flat file name or its date= folder.
+    name = parse_snapshot_name(file_path)
+    if name is not None:
+        return iso_date(name["date"])
+    return os.path.basename(os.path.dirname(os.path.dirname(file_path)))[len("date="):]
+
+
+def video_table_path(file_path):
+    # Shared video table of the date of a deduplicated region file, next to it.
+    name = parse_snapshot_name(file_path)
+    return os.path.join(os.path.dirname(file_path), f"{name['date']}_videos.{name['format']}")
+
+
+def snapshot_header(file_path):
+    # Column names of a region snapshot (those of its shared video table for a deduplicated region file),
+    # with each text hash column under the name of its text field, as the loaders return them.
+    name = parse_snapshot_name(file_path)
+    if name is not None and name["kind"] == "ranks":
+        file_path = video_table_path(file_path)
+    if file_path.endswith(".parquet"):
+        names = pq.read_schema(file_path).names
+    else:
+        with open(file_path, encoding="utf-8", newline="") as file:
+            names = next(csv.reader(file), [])
+    hashed = {f"{field}_hash": field for field in text_fields}
+    return [hashed.get(column, column) for column in names]
+
+
+def read_snapshot(file_path, columns=None):
+    """
+    Read one snapshot file, CSV or Parquet, into a DataFrame.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+
+    Returns:
+        pandas.DataFrame: The snapshot data.
+    """
+    # Parquet files are typed and read column by column; CSV files skip the unwanted columns while parsing.
+    # Requested columns the file does not have (such as a text field stored as its hash) come back empty.
+    if file_path.endswith(".parquet"):
+        names = pq.read_schema(file_path).names
+        data = pd.read_parquet(file_path, columns=[name for name in columns if name in names] if columns else None)
+    else:
+        data = pd.read_csv(file_path, usecols=(lambda name: name in columns) if columns else None)
+    return data.reindex(columns=columns) if columns else data
+
+
+def load_snapshot(file_path, columns=None, video_tables=None, typed=False):
+    """
+    Load one region snapshot with the full snapshot columns, whether it was deduplicated or not.
+
+    A deduplicated region file only holds video ids and ranks, so it is joined with the shared
+    video table of its date.
+
+    Args:
+        file_path (str): Path of the snapshot file.
+        columns (list, optional): Only return these columns. Defaults to None (every column).
+        video_tables (dict, optional): Shared video tables already read, by path, reused across calls.
+        typed (bool, optional): Read with the pinned snapshot types, so CSV and Parquet snapshots come back
+            alike, instead of the types pandas guesses file by file. Defaults to False.
+
+    Returns:
+        pandas.DataFrame: The snapshot data.
+    """
+    reader = read_typed_frame if typed else read_snapshot
+    name = parse_snapshot_name(file_path)
+    if name is None or name["kind"] == "videos":
+        return reader(file_path, columns)
+
+    # Join the ranks of the region with the shared video table of the same date.
+    video_tables = {} if video_tables is None else video_tables
+    table_path = video_table_path(file_path)
+    if table_path not in video_tables:
+        table_columns = list(dict.fromkeys(["video_id"] + columns)) if columns else None
+        video_tables[table_path] = reader(table_path, table_columns)
+    ranks = reader(file_path, ["video_id"])
+    data = ranks.merge(video_tables[table_path], on="video_id", how="left")
+    return data.reindex(columns=columns) if columns else data
+
+
+def text_store_path(folder_path):
+    # The text store of a snapshot folder lives inside it; loaders only pick up snapshot file names.
+    return os.path.join(folder_path, "texts.sqlite")
+
+
+def stored_columns(columns):
+    # Columns to read for the requested ones, adding the hash column of each text field.
+    if columns is None:
+        return None
+    return list(dict.fromkeys(stored for name in columns
+                              for stored in ((name, f"{name}_hash") if name in text_fields else (name,))))
+
+
+def attach_texts(data, folder_path, fields=None):
+    """
+    Put the texts of hashed text fields back, looking them up in the folder's text store.
+
+    Loaders leave descriptions and tags as hashes unless a text field is asked for, so numeric work
+    never pays for the texts. Rows from files that kept the full text are left as they are.
+
+    Args:
+        data (pandas.DataFrame): Loaded snapshot rows.
+        folder_path (str): The snapshot folder holding the text store.
+        fields (list, optional): Text fields to restore. Defaults to None (every text field).
+
+    Returns:
+        pandas.DataFrame: The rows with each "{field}_hash" column replaced by a "{field}" column.
+    """
+    fields = text_fields if fields is None else [field for field in fields if field in text_fields]
+    hashed = [field for field in fields if f"{field}_hash" in data.columns]
+    store_path = text_store_path(folder_path)
+    if not hashed or not os.path.exists(store_path):
+        return data
+    store = TextStore(store_path)
+    try:
+        for field in hashed:
+            hashes = data[f"{field}_hash"]
+            missing = hashes.isna() | (hashes == "")
+            texts = hashes.map(store.lookup(hashes[~missing].unique()))
+            if field in data.columns:
+                # Keep the text of rows whose file was not hashed.
+                texts = data[field].where(missing, texts)
+                data = data.drop(columns=field)
+            # The text takes the place of its hash column.
+            position = data.columns.get_loc(f"{field}_hash")
+            data = data.drop(columns=f"{field}_hash")
+            data.insert(position, field, texts)
+    finally:
+        store.close()
+    return data
+
+
+def read_snapshot_tables(file_paths, columns=None, max_workers=None):
+    """
+    Read region snapshots with pinned column types, full region files on a pool of processes.
+
+    Deduplicated region files are joined with the shared video table of their date in this process.
+
+    Args:
+        file_paths (list): Paths of the region snapshots.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+        max_workers (int, optional): Number of reader processes. Defaults to the CPU count.
+
+    Returns:
+        list: One table per file, in the order of `file_paths`, ready for tables_to_frame.
+    """
+    is_ranks = [(parse_snapshot_name(file_path) or {}).get("kind") == "ranks" for file_path in file_paths]
+    plain_tables = iter(read_tables([file_path for file_path, ranks in zip(file_paths, is_ranks) if not ranks],
+                                    columns, max_workers))
+    video_tables = {}  # Shared video tables of deduplicated dates, read once
+    tables = []
+    for file_path, ranks in zip(file_paths, is_ranks):
+        if ranks:
+            tables.append(frame_to_table(load_snapshot(file_path, columns, video_tables, typed=True)))
+        else:
+            tables.append(next(plain_tables))
+    return tables
+
+
+def elist(folder_path, columns=None, start=None, end=None, regions=None, max_workers=None):
+    """
+    Load the region snapshots of a folder (flat or partitioned) into one typed DataFrame.
+
+    Only the requested dates, regions and columns are read, in parallel, with integer counts, boolean
+    flags and categorical channels and categories instead of types guessed file by file. Shared video
+    tables are only read through the region files that point at them. No API key is needed.
+
+    Args:
+        folder_path (str): The output folder.
+        columns (list, optional): Only read these columns. Defaults to None (every column).
+        start (str, optional): First trending date to keep, as YYYY-MM-DD. Defaults to None.
+        end (str, optional): Last trending date to keep, as YYYY-MM-DD. Defaults to None.
+        regions (iterable, optional): Country codes to keep. Defaults to None (every region).
+        max_workers (int, optional): Number of reader processes. Defaults to the CPU count.
+
+    Returns:
+        pandas.DataFrame: The rows of every selected snapshot.
+    """
+    file_paths = [file_path for file_path, _ in snapshot_files(folder_path, start, end, regions)]
+    data = tables_to_frame(read_snapshot_tables(file_paths, stored_columns(columns), max_workers))
+    # Texts kept in the text store are only looked up when a text field was asked for.
+    return attach_texts(data, folder_path, columns).reindex(columns=columns) if columns else data
+
+
+def list_of_data(folder_path, columns=None, start=None, end=None, regions=None, max_workers=None):
+    """
+    Load the region snapshots of a folder into one typed DataFrame per country, like elist.
+
+    Country codes are taken from the file names (flat layout) or the region= folders (partitioned layout).
+
+    Returns:
+        dict: Country code to the DataFrame of its snapshots, for the countries that have any.
+    """
+    file_paths = snapshot_files(folder_path, start, end, regions)
+
+    # Files of the known countries; matching the code anywhere in the path would also put every "_videos"
+    # file under DE and every file under US on a path like C:\Users.
+    country_code_mapping = {'US': [], 'UK': [], 'GB': [], 'DE': [], 'CA': [], 'FR': [], 'KR': [], 'RU': [],
+                            'JP': [], 'BR': [], 'MX': [], 'IN': []}
+    for file_path, code in file_paths:
+        if code in country_code_mapping:
+            country_code_mapping[code].append(file_path)
+
+    # Read every snapshot file (only the requested columns) once, in parallel and with pinned types
+    all_files = [file_path for filenames in country_code_mapping.values() for file_path in filenames]
+    tables = dict(zip(all_files, read_snapshot_tables(all_files, stored_columns(columns), max_workers)))
+
+    dataframes_by_country = {}
+    for country_code, filenames in country_code_mapping.items():
+        if not filenames:
+            continue
+        data = tables_to_frame([tables.pop(filename) for filename in filenames])
+        # Texts kept in the text store are only looked up when a text field was asked for
+        dataframes_by_country[country_code] = \
+            attach_texts(data, folder_path, columns).reindex(columns=columns) if columns else data
+    return dataframes_by_country
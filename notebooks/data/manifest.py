@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import time
+
+from atomic import save_json_atomic
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Return the SHA-256 of a file, read in chunks so large snapshots are never loaded whole."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConsolidationManifest:
+    """
+    A JSON record of the snapshot files already folded into the consolidated datasets.
+
+    Each snapshot is recorded with its size, modification time and SHA-256, and each dataset with its
+    row count and byte size after the last pass. A later pass can then append only the snapshots that
+    arrived since, and falls back to a full rebuild when a recorded snapshot changed or disappeared,
+    when the columns or output folder differ, or when a dataset is not the size the manifest expects
+    (for instance after a pass that crashed half-way through appending).
+    """
+
+    def __init__(self, state_dir):
+        self.path = os.path.join(state_dir, "manifest.json")
+        self.entries = self.load()
+
+    def load(self):
+        # Read the manifest of the last successful pass, if any.
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def fingerprint(self, file_path, name):
+        """
+        Return the size, modification time and SHA-256 of a snapshot.
+
+        The hash of the last pass is reused when the size and modification time did not move, so an
+        unchanged history is checked with one stat per file instead of being read again.
+
+        Args:
+            file_path (str): Path of the snapshot.
+            name (str): Name of the snapshot in the manifest (its path under the output folder).
+
+        Returns:
+            dict: The "size", "mtime" and "sha256" of the file.
+        """
+        stat = os.stat(file_path)
+        previous = self.entries.get("files", {}).get(name)
+        if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": previous["sha256"]}
+        return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_sha256(file_path)}
+
+    def plan(self, fingerprints, settings):
+        """
+        Decide whether the datasets can be extended or must be rebuilt.
+
+        Args:
+            fingerprints (dict): Fingerprint of every current snapshot, by name.
+            settings (dict): Output folder and columns of this pass; any change forces a rebuild.
+
+        Returns:
+            tuple: (rebuild, new_names) where rebuild is a bool and new_names lists the snapshots
+            to append when rebuild is False.
+        """
+        files = self.entries.get("files")
+        if files is None or self.entries.get("settings") != settings:
+            return True, list(fingerprints)
+        # A snapshot that changed or disappeared is already inside the datasets in its old form.
+        for name, recorded in files.items():
+            current = fingerprints.get(name)
+            if current is None or current["sha256"] != recorded["sha256"]:
+                return True, list(fingerprints)
+        # Every dataset must be exactly as the last pass left it, or appending would duplicate rows.
+        for dataset in self.entries.get("datasets", {}).values():
+            if not os.path.exists(dataset["path"]) or os.path.getsize(dataset["path"]) != dataset["bytes"]:
+                return True, list(fingerprints)
+        return False, [name for name in fingerprints if name not in files]
+
+    def record(self, fingerprints, datasets, settings):
+        """
+        Save the state after a successful pass.
+
+        Args:
+            fingerprints (dict): Fingerprint of every snapshot now folded in, by name.
+            datasets (dict): Path, rows and bytes of every dataset, by dataset name.
+            settings (dict): Output folder and columns of the pass.
+        """
+        self.entries = {
+            "settings": settings,
+            "files": fingerprints,
+            "datasets": datasets,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self):
+        save_json_atomic(self.path, self.entries, indent=2)
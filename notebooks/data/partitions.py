@@ -0,0 +1,135 @@
+import argparse
+import os
+import time
+from datetime import datetime
+
+from writers import ParquetSnapshotWriter
+
+
+def iso_date(trending_date):
+    """
+    Turn a trending date of a flat snapshot name (yy.dd.mm, which does not sort) into YYYY-MM-DD.
+
+    Args:
+        trending_date (str): A date such as "23.02.08" (2 August 2023).
+
+    Returns:
+        str: The same date as "2023-08-02".
+    """
+    return datetime.strptime(trending_date, "%y.%d.%m").strftime("%Y-%m-%d")
+
+
+def partition_path(root, date, region, output_format="parquet", part=0):
+    """
+    Build the path of a file in the partitioned layout: root/date=YYYY-MM-DD/region=XX/part-NNNNN.ext.
+
+    Args:
+        root (str): Root folder of the dataset.
+        date (str): The date as YYYY-MM-DD.
+        region (str): The country code.
+        output_format (str, optional): File extension. Defaults to "parquet".
+        part (int, optional): Number of the part file. Defaults to 0.
+
+    Returns:
+        str: Path of the part file.
+    """
+    return os.path.join(root, f"date={date}", f"region={region}", f"part-{part:05d}.{output_format}")
+
+
+def is_partitioned(root):
+    """Tell whether a folder holds the partitioned layout (date=... folders) rather than flat snapshot files."""
+    return os.path.isdir(root) and any(name.startswith("date=") for name in os.listdir(root))
+
+
+def list_partitions(root, start=None, end=None, regions=None):
+    """
+    List the part files of a partitioned dataset, opening only the folders that match the filters.
+
+    Dates are compared as YYYY-MM-DD strings, so date folders outside [start, end] and region folders
+    not asked for are pruned by name, without listing or reading what is inside them.
+
+    Args:
+        root (str): Root folder of the dataset.
+        start (str, optional): First date to keep, as YYYY-MM-DD. Defaults to None (no lower bound).
+        end (str, optional): Last date to keep, as YYYY-MM-DD. Defaults to None (no upper bound).
+        regions (iterable, optional): Country codes to keep. Defaults to None (every region).
+
+    Returns:
+        list: (date, region, file path) tuples, sorted by date, region and part.
+    """
+    regions = set(regions) if regions else None
+    partitions = []
+    for date_dir in sorted(os.listdir(root)):
+        if not date_dir.startswith("date="):
+            continue
+        date = date_dir[len("date="):]
+        if (start and date < start) or (end and date > end):
+            continue
+        for region_dir in sorted(os.listdir(os.path.join(root, date_dir))):
+            region = region_dir[len("region="):]
+            if not region_dir.startswith("region=") or (regions and region not in regions):
+                continue
+            region_path = os.path.join(root, date_dir, region_dir)
+            for name in sorted(os.listdir(region_path)):
+                # Skip temporary and hidden files a writer may leave next to the parts.
+                if name.startswith("part-"):
+                    partitions.append((date, region, os.path.join(region_path, name)))
+    return partitions
+
+
+def migrate_snapshots(source_dir, target_dir, remove=False):
+    """
+    Copy the flat snapshot files of a folder into the partitioned Parquet layout.
+
+    Every region file (deduplicated ones are joined with their video table first) becomes
+    target_dir/date=YYYY-MM-DD/region=XX/part-00000.parquet. Partitions that already exist are left
+    alone, so the migration can be run again after new flat files arrive.
+
+    Args:
+        source_dir (str): Folder of the flat snapshot files.
+        target_dir (str): Root folder of the partitioned dataset.
+        remove (bool, optional): Delete each flat file (and used video tables) once migrated. Defaults to False.
+
+    Returns:
+        int: Number of files migrated.
+    """
+    # loading lists partitions through this module, so it is imported once both are loaded.
+    from loading import load_snapshot, parse_snapshot_name
+
+    migrated = 0
+    video_tables = {}
+    for name in sorted(os.listdir(source_dir)):
+        snapshot = parse_snapshot_name(name)
+        # Video tables are only migrated through the region files that point at them.
+        if snapshot is None or snapshot["code"] is None:
+            continue
+        file_path = os.path.join(source_dir, name)
+        target_path = partition_path(target_dir, iso_date(snapshot["date"]), snapshot["code"])
+        if not os.path.exists(target_path):
+            data = load_snapshot(file_path, video_tables=video_tables)
+            # Plain Python values (None for missing ones) go through the same typed writer as new snapshots.
+            rows = data.astype(object).where(data.notna(), None).values.tolist()
+            # Write to a temporary name first, so an interrupted migration never leaves a broken part behind.
+            temp_path = os.path.join(os.path.dirname(target_path), f".{os.path.basename(target_path)}.tmp")
+            with ParquetSnapshotWriter(temp_path, header=list(data.columns)) as writer:
+                writer.write_rows(rows)
+            os.replace(temp_path, target_path)
+            migrated += 1
+        if remove:
+            os.remove(file_path)
+    if remove:
+        for table_path in video_tables:
+            os.remove(table_path)
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move flat output/ snapshots to the date=/region= layout")
+    parser.add_argument("--source", default=os.path.join("..", "..", "output"))
+    parser.add_argument("--target", default=os.path.join("..", "..", "output_partitioned"))
+    parser.add_argument("--remove", action="store_true", help="Delete the flat files once migrated")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = migrate_snapshots(args.source, args.target, remove=args.remove)
+    print(f"Migrated {count} snapshot files to {args.target} in {time.perf_counter() - started:.1f}s")
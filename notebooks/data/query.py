@@ -0,0 +1,175 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from loading import load_snapshot, snapshot_date, snapshot_files
+
+
+class SnapshotDatabase:
+    """
+    An embedded SQL layer over the snapshot corpus, so ad-hoc questions do not load every file with pandas.
+
+    Region snapshots (flat or partitioned, CSV or Parquet) are loaded once into a single SQLite table,
+    `snapshots`, with a `region` and an ISO `date` column and indexes on video_id, channelId, region and
+    date. Later builds only load files that are new or changed, so the database follows output/ as it
+    grows. Questions are answered by SQLite from the indexes, without materializing the corpus in memory.
+    """
+
+    # Column types; every other column is stored as text.
+    integer_columns = ["view_count", "likes", "dislikes", "comment_count", "channel_subscriber_count", "rank"]
+    flag_columns = ["comments_disabled", "ratings_disabled"]
+    indexes = {"video_id": ["video_id"], "channel": ["channelId"], "region_date": ["region", "date"],
+               "date": ["date"], "file": ["file"]}
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS loaded_files (name TEXT PRIMARY KEY, size INTEGER, "
+                                "mtime REAL, rows INTEGER)")
+
+    def columns(self):
+        # Columns of the snapshots table, or an empty list before the first build.
+        return [row[1] for row in self.connection.execute("PRAGMA table_info(snapshots)")]
+
+    def column_type(self, name):
+        # SQLite type of a snapshot column.
+        return "INTEGER" if name in self.integer_columns + self.flag_columns else "TEXT"
+
+    def ensure_columns(self, names):
+        # Create the table on the first file and add the columns that later files bring (such as enrichment).
+        existing = self.columns()
+        if not existing:
+            definitions = ", ".join(f'"{name}" {self.column_type(name)}' for name in names)
+            self.connection.execute(f"CREATE TABLE snapshots ({definitions})")
+            for index_name, index_columns in self.indexes.items():
+                self.connection.execute(f"CREATE INDEX idx_snapshots_{index_name} ON snapshots "
+                                        f"({', '.join(index_columns)})")
+            return
+        for name in names:
+            if name not in existing:
+                self.connection.execute(f'ALTER TABLE snapshots ADD COLUMN "{name}" {self.column_type(name)}')
+
+    def build(self, folder_path):
+        """
+        Load the region snapshots of a folder that are new or changed since the last build, and drop the
+        rows of snapshots that were removed.
+
+        Args:
+            folder_path (str): The output folder.
+
+        Returns:
+            int: Number of files loaded.
+        """
+        loaded = {name: (size, mtime) for name, size, mtime in
+                  self.connection.execute("SELECT name, size, mtime FROM loaded_files")}
+        video_tables = {}  # Shared video tables of deduplicated dates, read once
+        count = 0
+        names = set()
+        for file_path, region in snapshot_files(folder_path):
+            name = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+            names.add(name)
+            stat = os.stat(file_path)
+            if loaded.get(name) == (stat.st_size, stat.st_mtime):
+                continue
+
+            data = load_snapshot(file_path, video_tables=video_tables, typed=True)
+            data.insert(0, "date", snapshot_date(file_path))
+            data.insert(1, "region", region)
+            data.insert(2, "rank", range(1, len(data) + 1))
+            data.insert(3, "file", name)
+            for flag in self.flag_columns:
+                if flag in data.columns:
+                    data[flag] = data[flag].astype(str).eq("True").astype(int)
+
+            self.ensure_columns(list(data.columns))
+            # A changed file replaces the rows it loaded before.
+            self.connection.execute("DELETE FROM snapshots WHERE file = ?", (name,))
+            data.to_sql("snapshots", self.connection, if_exists="append", index=False, chunksize=5000)
+            self.connection.execute("INSERT OR REPLACE INTO loaded_files VALUES (?, ?, ?, ?)",
+                                    (name, stat.st_size, stat.st_mtime, len(data)))
+            # One transaction per file, so an interrupted build resumes at the file it stopped in.
+            self.connection.commit()
+            count += 1
+        for name in set(loaded) - names:
+            self.connection.execute("DELETE FROM snapshots WHERE file = ?", (name,))
+            self.connection.execute("DELETE FROM loaded_files WHERE name = ?", (name,))
+        self.connection.commit()
+        self.connection.execute("ANALYZE")
+        return count
+
+    def query(self, sql, params=()):
+        """
+        Run a SQL query against the `snapshots` table.
+
+        Args:
+            sql (str): The query.
+            params (tuple or dict, optional): Query parameters. Defaults to ().
+
+        Returns:
+            pandas.DataFrame: The result.
+        """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def video_trend(self, video_id):
+        """How a video trended across regions: its rank and counters on each date and region."""
+        return self.query("SELECT date, region, rank, view_count, likes, comment_count FROM snapshots "
+                          "WHERE video_id = ? ORDER BY date, region", (video_id,))
+
+    def top_channels(self, region, start=None, end=None, limit=10):
+        """
+        The channels with the most trending appearances in a region over a date range.
+
+        Args:
+            region (str): The country code.
+            start (str, optional): First date, as YYYY-MM-DD. Defaults to None (no lower bound).
+            end (str, optional): Last date, as YYYY-MM-DD. Defaults to None (no upper bound).
+            limit (int, optional): Number of channels returned. Defaults to 10.
+
+        Returns:
+            pandas.DataFrame: channelId, channelTitle, appearances, distinct videos and best views.
+        """
+        return self.query("""
+            SELECT channelId, MAX(channelTitle) AS channelTitle, COUNT(*) AS appearances,
+                   COUNT(DISTINCT video_id) AS videos, MAX(view_count) AS max_views
+            FROM snapshots
+            WHERE region = ? AND date BETWEEN ? AND ?
+            GROUP BY channelId ORDER BY appearances DESC, max_views DESC LIMIT ?""",
+                          (region, start or "0000-00-00", end or "9999-99-99", limit))
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL queries over the trending snapshots")
+    parser.add_argument("--output-dir", default=os.path.join("..", "..", "output"))
+    parser.add_argument("--db", default=os.path.join("..", "..", "snapshots.sqlite"))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Load new or changed snapshots into the database")
+    sql = subparsers.add_parser("sql", help="Run a SQL query against the snapshots table")
+    sql.add_argument("query")
+    video = subparsers.add_parser("video", help="Show how a video trended across regions")
+    video.add_argument("video_id")
+    channels = subparsers.add_parser("top-channels", help="Channels with the most trending appearances")
+    channels.add_argument("region")
+    channels.add_argument("--start")
+    channels.add_argument("--end")
+    channels.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    database = SnapshotDatabase(args.db)
+    started = time.perf_counter()
+    if args.command == "build":
+        print(f"Loaded {database.build(args.output_dir)} snapshot files")
+    elif args.command == "sql":
+        print(database.query(args.query).to_string(index=False))
+    elif args.command == "video":
+        print(database.video_trend(args.video_id).to_string(index=False))
+    elif args.command == "top-channels":
+        print(database.top_channels(args.region, args.start, args.end, args.limit).to_string(index=False))
+    print(f"Done in {(time.perf_counter() - started) * 1000:.1f} ms")
+    database.close()
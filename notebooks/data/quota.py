@@ -0,0 +1,222 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from atomic import save_json_atomic
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+
+class QuotaExhausted(Exception):
+    """Raised when a request would go over the daily unit budget of its API key."""
+
+
+class QuotaScheduler:
+    """
+    Keep track of the YouTube Data API unit budget and pace the calls made against it.
+
+    Every call goes through `acquire`, which:
+    - charges the cost of the API method to the key and to the region it was made for,
+    - refuses the call (QuotaExhausted) once the key's daily budget is spent, so the scraper stops
+      cleanly before the API starts answering with errors,
+    - paces calls with a token bucket refilled at `daily_budget / 86400` units per second, so the
+      budget is spread over the day, while `burst` units can be spent at once for a normal scrape,
+    - serves waiting callers by priority: first pages of regions, then follow-up pages, then refresh jobs.
+
+    Quota days follow the API, which resets budgets at midnight Pacific time. Usage of each day is persisted
+    in `state_dir`, so several runs on the same day share the budget, and `write_report` adds what the current
+    run spent to the usage file instead of overwriting what other runs saved.
+    """
+
+    # Time zone of the API quota day.
+    quota_timezone = "America/Los_Angeles"
+
+    # Cost in units of each API method, taken from the YouTube Data API quota table.
+    costs = {"videos.list": 1, "channels.list": 1, "videoCategories.list": 1}
+
+    # Priority levels; lower numbers are served first.
+    PRIORITY_REGION = 0
+    PRIORITY_PAGE = 1
+    PRIORITY_REFRESH = 2
+
+    def __init__(self, state_dir, daily_budget=10000, burst=1000, refresh_reserve=0.1):
+        # Folder holding the daily usage files and the per-run reports.
+        self.state_dir = state_dir
+        # Units each key may spend per day.
+        self.daily_budget = daily_budget
+        # Largest number of units that can be spent back to back without pacing.
+        self.burst = min(burst, daily_budget)
+        # Share of the budget kept for scraping; refresh jobs are refused once only this much is left.
+        self.refresh_reserve = int(daily_budget * refresh_reserve)
+        # Units added to the bucket every second, so a full budget lasts a whole day.
+        self.rate = daily_budget / 86400.0
+
+        self.day = self.quota_day()
+        self.tokens = float(self.burst)
+        self.last_refill = time.monotonic()
+
+        # Units spent today per key (including earlier runs) and by this run per key, region and method.
+        self.spent_today = self.load_usage()
+        # Units spent by this run per quota day and key that are not in the usage files yet.
+        self.unsaved = {}
+        self.run_usage = {"keys": {}, "regions": {}, "methods": {}}
+        self.calls = 0
+        self.denied = 0
+        self.waited_seconds = 0.0
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        # Waiting callers ordered by (priority, arrival), guarded by one condition variable.
+        self.waiting = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def key_id(api_key):
+        """Return a short fingerprint of an API key, so reports never contain the key itself."""
+        return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:8]
+
+    def quota_day(self):
+        # Date of the current quota day, in Pacific time.
+        try:
+            zone = ZoneInfo(self.quota_timezone)
+        except (TypeError, KeyError):
+            # Without time zone data (zoneinfo missing or no tzdata on Windows), use Pacific standard time.
+            zone = timezone(timedelta(hours=-8))
+        return datetime.now(zone).strftime("%Y-%m-%d")
+
+    def usage_path(self, day=None):
+        # One usage file per quota day.
+        return os.path.join(self.state_dir, f"usage_{day or self.day}.json")
+
+    def load_usage(self, day=None):
+        # Read the units already spent on a quota day (today by default) by earlier runs, if any.
+        path = self.usage_path(day)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def roll_over(self):
+        # Start a new quota day once midnight Pacific time has passed, with the usage other runs saved for it.
+        day = self.quota_day()
+        if day != self.day:
+            self.day = day
+            self.spent_today = self.load_usage()
+            for key_id, spent in self.unsaved.get(day, {}).items():
+                self.spent_today[key_id] = self.spent_today.get(key_id, 0) + spent
+
+    def remaining(self, api_key):
+        """Return how many units the given key can still spend today."""
+        return self.daily_budget - self.spent_today.get(self.key_id(api_key), 0)
+
+    def refill(self):
+        # Add the units earned since the last refill, without going over the burst size.
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def acquire(self, method, api_key, region, priority=PRIORITY_PAGE):
+        """
+        Wait until a call may be made, then charge its cost.
+
+        Args:
+            method (str): The API method, e.g. "videos.list".
+            api_key (str): The key the call will be made with.
+            region (str): The region (or job name) the call is made for.
+            priority (int, optional): One of the PRIORITY_* levels. Defaults to PRIORITY_PAGE.
+
+        Raises:
+            QuotaExhausted: If the key has not enough budget left for this call.
+        """
+        cost = self.costs.get(method, 1)
+        key_id = self.key_id(api_key)
+        with self.condition:
+            ticket = (priority, next(self.counter))
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    self.roll_over()
+                    self.refill()
+                    left = self.daily_budget - self.spent_today.get(key_id, 0)
+                    if left < cost or (priority >= self.PRIORITY_REFRESH and left - cost < self.refresh_reserve):
+                        self.denied += 1
+                        raise QuotaExhausted(f"Key {key_id} has {left} units left, {method} needs {cost}")
+
+                    # Only the caller at the head of the queue may take tokens.
+                    if self.waiting[0] == ticket and self.tokens >= cost:
+                        break
+                    timeout = (cost - self.tokens) / self.rate if self.waiting[0] == ticket else None
+                    started = time.monotonic()
+                    self.condition.wait(timeout)
+                    self.waited_seconds += time.monotonic() - started
+
+                heapq.heappop(self.waiting)
+                self.tokens -= cost
+                self.calls += 1
+                self.spent_today[key_id] = self.spent_today.get(key_id, 0) + cost
+                unsaved = self.unsaved.setdefault(self.day, {})
+                unsaved[key_id] = unsaved.get(key_id, 0) + cost
+                for group, name in (("keys", key_id), ("regions", region), ("methods", method)):
+                    self.run_usage[group][name] = self.run_usage[group].get(name, 0) + cost
+            finally:
+                # A refused or failed caller leaves the queue so the next one can go.
+                if ticket in self.waiting:
+                    self.waiting.remove(ticket)
+                    heapq.heapify(self.waiting)
+                self.condition.notify_all()
+
+    def report(self):
+        """Return the usage of this run as a dictionary."""
+        with self.condition:
+            return {
+                "started": self.started,
+                "quota_day": self.day,
+                "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "daily_budget": self.daily_budget,
+                "calls": self.calls,
+                "denied": self.denied,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "units": {group: dict(values) for group, values in self.run_usage.items()},
+                "remaining_today": {key: self.daily_budget - spent for key, spent in self.spent_today.items()},
+            }
+
+    def save_usage(self):
+        """
+        Add the units this run spent since the last save to the usage files of their quota days.
+
+        The files are read again before writing, so units saved meanwhile by other runs sharing
+        `state_dir` are kept.
+        """
+        with self.condition:
+            for day, spent in self.unsaved.items():
+                usage = self.load_usage(day)
+                for key_id, units in spent.items():
+                    usage[key_id] = usage.get(key_id, 0) + units
+                save_json_atomic(self.usage_path(day), usage, indent=2)
+                if day == self.day:
+                    self.spent_today = usage
+            self.unsaved = {}
+
+    def write_report(self, extra=None):
+        """
+        Save this run's usage and a report of it to `state_dir`.
+
+        Args:
+            extra (dict, optional): More figures to store in the report, such as the scraper stats.
+
+        Returns:
+            str: Path of the written report.
+        """
+        self.save_usage()
+        report = dict(self.report(), **(extra or {}))
+        report_path = os.path.join(self.state_dir, f"report_{time.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        save_json_atomic(report_path, report, indent=2)
+        return report_path
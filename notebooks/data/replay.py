@@ -0,0 +1,239 @@
+import csv
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def parse_field_mask(mask):
+    """
+    Parse a partial-response `fields` mask such as "items(id,snippet(title,thumbnails/default/url))".
+
+    Args:
+        mask (str): The field mask.
+
+    Returns:
+        dict: A tree of the selected keys; True marks a key kept whole.
+    """
+    def parse_list(position):
+        tree = {}
+        while position < len(mask) and mask[position] != ")":
+            start = position
+            while position < len(mask) and mask[position] not in ",()":
+                position += 1
+            path = mask[start:position].strip().split("/")
+            selection = True
+            if position < len(mask) and mask[position] == "(":
+                selection, position = parse_list(position + 1)
+                position += 1  # Skip the closing parenthesis.
+            # "a/b/c" selects c inside b inside a.
+            node = tree
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = selection
+            if position < len(mask) and mask[position] == ",":
+                position += 1
+        return tree, position
+
+    return parse_list(0)[0]
+
+
+def apply_field_mask(value, tree):
+    """Keep only the keys of a decoded JSON value selected by a tree from parse_field_mask."""
+    if tree is True:
+        return value
+    if isinstance(value, list):
+        return [apply_field_mask(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: apply_field_mask(value[key], selection) for key, selection in tree.items() if key in value}
+    return value
+
+
+def fixture_path(fixtures_dir, region, page_token=None):
+    # Pages are stored per region, named after the token that requests them ("first" for page one).
+    return os.path.join(fixtures_dir, region, f"{page_token or 'first'}.json")
+
+
+class RecordingTransport:
+    """
+    Wrap an ApiTransport and save every successful trending page as a fixture for the replay server.
+
+    Example usage:
+    >> scraper.transport = RecordingTransport(scraper.transport, "fixtures")
+    >> scraper.get_data()
+    """
+
+    def __init__(self, transport, fixtures_dir):
+        self.transport = transport
+        self.fixtures_dir = fixtures_dir
+
+    def get(self, url, params=None, headers=None, retry_rate_limits=True, max_retries=None):
+        # Never record a conditional request, whose answer may be an empty 304.
+        response = self.transport.get(url, params=params, headers=None, retry_rate_limits=retry_rate_limits,
+                                      max_retries=max_retries)
+        if response.status_code == 200 and params and "regionCode" in params:
+            path = fixture_path(self.fixtures_dir, params["regionCode"], params.get("pageToken"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(response.content)
+        return response
+
+    def retry_after(self, response):
+        # The wait asked by a rate limited answer, as read by the wrapped transport.
+        return self.transport.retry_after(response)
+
+
+def fixtures_from_snapshots(folder_path, fixtures_dir, date=None, page_size=50):
+    """
+    Build replay fixtures from snapshot CSVs already in output/, for when no live key is at hand.
+
+    Every region file of the chosen date becomes a chain of API pages holding the same videos.
+
+    Args:
+        folder_path (str): Folder holding the snapshot CSV files.
+        fixtures_dir (str): Folder the fixtures are written to.
+        date (str, optional): Trending date ("yy.dd.mm") to use. Defaults to the latest date found.
+        page_size (int, optional): Videos per page. Defaults to 50, like the API.
+
+    Returns:
+        list: The regions that fixtures were written for.
+    """
+    # Only full region files ("{date}_{code}_videos.csv") can be turned into pages.
+    files = sorted(name for name in os.listdir(folder_path)
+                   if name.endswith("_videos.csv") and name.count("_") == 2)
+    # Dates are "yy.dd.mm", so they are sorted on (year, month, day).
+    dates = sorted({name.split("_")[0] for name in files}, key=lambda value: (value[:2], value[6:], value[3:5]))
+    date = date or dates[-1]
+    regions = []
+    for name in files:
+        file_date, region, _ = name.split("_")
+        if file_date != date:
+            continue
+        with open(os.path.join(folder_path, name), encoding="utf-8", newline="") as file:
+            items = [{
+                "kind": "youtube#video",
+                "id": row["video_id"],
+                "snippet": {
+                    "publishedAt": row["publishedAt"], "channelId": row["channelId"], "title": row["title"],
+                    "description": row["description"], "channelTitle": row["channelTitle"],
+                    "categoryId": row["categoryId"],
+                    "thumbnails": {"default": {"url": row["thumbnail_link"]}},
+                    **({} if row["tags"] == "[none]" else {"tags": row["tags"].split("|")}),
+                },
+                "statistics": {
+                    "viewCount": row["view_count"], "likeCount": row["likes"],
+                    **({} if row["comments_disabled"] == "True" else {"commentCount": row["comment_count"]}),
+                },
+            } for row in csv.DictReader(file)]
+
+        pages = [items[start:start + page_size] for start in range(0, len(items), page_size)] or [[]]
+        for number, page in enumerate(pages):
+            token = f"P{number}" if number else None
+            body = {"kind": "youtube#videoListResponse", "items": page,
+                    "pageInfo": {"totalResults": len(items), "resultsPerPage": page_size}}
+            if number + 1 < len(pages):
+                body["nextPageToken"] = f"P{number + 1}"
+            path = fixture_path(fixtures_dir, region, token)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as out:
+                json.dump(body, out)
+        regions.append(region)
+    return regions
+
+
+class ReplayServer:
+    """
+    A local HTTP stand-in for the YouTube Data API that serves recorded pages.
+
+    It answers `GET /youtube/v3/videos?regionCode=..&pageToken=..` from the fixtures folder, applying the
+    `fields` mask when one is sent, waits `latency` seconds before each answer and, with probability
+    `error_rate`, answers HTTP 429 with a Retry-After header instead, so the retry path can be exercised.
+
+    Example usage:
+    >> with ReplayServer("fixtures", latency=0.05) as server:
+    >>     scraper = YouTubeDataScraper(..., api_base=server.api_base)
+    """
+
+    def __init__(self, fixtures_dir, latency=0.0, error_rate=0.0, retry_after=0.05, host="127.0.0.1", port=0):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        # Counters of what was served, for benchmarks and checks.
+        self.stats = {"pages": 0, "rate_limited": 0, "missing": 0}
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def api_base(self):
+        """Base URL to hand to the scraper instead of https://www.googleapis.com/youtube/v3."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/youtube/v3"
+
+    def count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if replay.latency:
+                    time.sleep(replay.latency)
+                if replay.error_rate and random.random() < replay.error_rate:
+                    replay.count("rate_limited")
+                    return self.send(429, {"error": {"code": 429, "message": "Too Many Requests"}},
+                                     {"Retry-After": str(replay.retry_after)})
+
+                query = parse_qs(urlparse(self.path).query)
+                region = query.get("regionCode", [""])[0]
+                token = query.get("pageToken", [None])[0]
+                path = fixture_path(replay.fixtures_dir, region, token)
+                if not os.path.exists(path):
+                    replay.count("missing")
+                    return self.send(404, {"error": {"code": 404, "message": f"No fixture for {region} {token}"}})
+                replay.count("pages")
+                with open(path, "rb") as file:
+                    body = file.read()
+                if "fields" in query:
+                    body = apply_field_mask(json.loads(body), parse_field_mask(query["fields"][0]))
+                self.send(200, body)
+
+            def send(self, status, body, headers=None):
+                body = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                # Keep benchmark output quiet.
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
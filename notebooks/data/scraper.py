@@ -1,38 +1,106 @@
+import csv
 import os
+import threading
 import time
-import requests
 import pandas as pd
-import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache import ResponseCache
+from checkpoint import CheckpointStore
+from enrichment import SnapshotEnricher
+from keypool import ApiKeyPool
+from loading import (attach_texts, elist, list_of_data, load_snapshot, snapshot_files, snapshot_header,
+                     stored_columns, text_fields, text_store_path)
+from manifest import ConsolidationManifest
+from partitions import iso_date, partition_path
+from quota import QuotaExhausted, QuotaScheduler
+from textstore import TextStore
+from tracker import VideoTracker
+from transport import ApiTransport, TransportError, decode_json
+from writers import CsvSnapshotWriter, ParquetSnapshotWriter
 
 # Define a class called YouTubeDataScraper to manage the scraping process.
 class YouTubeDataScraper:
+    # Writer used for each output format.
+    snapshot_writers = {"csv": CsvSnapshotWriter, "parquet": ParquetSnapshotWriter}
+
     # Initialize the class with necessary parameters.
-    def __init__(self, api_key_path, country_code_path, output_dir):
-        # Read and store the API key from the given file path.
-        self.api_key = self.read_api_key(api_key_path)
+    def __init__(self, api_key_path, country_code_path, output_dir, max_workers=1, state_dir=None,
+                 daily_quota=10000, output_format="csv", deduplicate=False, cache_ttl=6 * 3600,
+                 cache_max_bytes=256 * 1024 * 1024, api_base="https://www.googleapis.com/youtube/v3",
+                 field_mask=True, key_strategy="round_robin", enrich=False, layout="flat",
+                 text_store=False):
         # Read and store the country codes from the provided file path.
         self.country_codes = self.read_country_codes(country_code_path)
         # Set the output directory for storing the scraped data.
         self.output_dir = output_dir
+        # Choose how snapshots are stored: quoted CSV, or typed Parquet that later loads can read column by column.
+        if output_format not in self.snapshot_writers:
+            raise ValueError(f"output_format must be one of {list(self.snapshot_writers)}, not {output_format!r}")
+        self.output_format = output_format
+        # Lay snapshots out flat ("{date}_{code}_videos.csv") or partitioned by date and region
+        # ("date=YYYY-MM-DD/region=XX/part-00000.parquet"), which sorts by date and lets loaders skip folders.
+        if layout not in ("flat", "hive"):
+            raise ValueError(f"layout must be 'flat' or 'hive', not {layout!r}")
+        if layout == "hive" and deduplicate:
+            raise ValueError("The hive layout keeps full region files and cannot be combined with deduplicate")
+        self.layout = layout
+        # When deduplicating, region files only hold (video_id, region, rank) and every video of the date is
+        # stored once, in a shared video table, however many regions it trends in.
+        self.deduplicate = deduplicate
+        self.rank_header = ["video_id", "region", "rank"]
+        self.video_table = None
+        self.video_table_lock = threading.Lock()
+        self.seen_videos = set()
+        # Set how many regions may be scraped at the same time (1 keeps the sequential behaviour).
+        self.max_workers = max(1, int(max_workers))
+        # Base URL of the YouTube Data API (or of a local replay server) and the endpoint of the trending charts.
+        self.api_base = api_base.rstrip("/")
+        self.api_url = f"{self.api_base}/videos"
+        # Share one pooled, retrying HTTP session between all requests (and all worker threads, including
+        # those of the tracker).
+        self.transport = ApiTransport(pool_size=max(self.max_workers, VideoTracker.max_workers))
+        # Keep bookkeeping files (quota usage, reports) next to the output directory, never inside it,
+        # because every file in the output directory is read back as a snapshot.
+        self.state_dir = state_dir or os.path.join(os.path.dirname(os.path.abspath(output_dir)), "scraper_state")
+        # Track and pace the API units spent against the daily budget of the key.
+        self.scheduler = QuotaScheduler(os.path.join(self.state_dir, "quota"), daily_budget=daily_quota)
+        # Load every key of the key file (one per line) into a pool that rotates between them and rests
+        # keys that get throttled, so one exhausted key does not stall the run.
+        self.key_pool = ApiKeyPool.from_file(api_key_path, self.scheduler, strategy=key_strategy)
+        # Keep API responses on disk, so re-running the same day costs no quota (a cache_ttl of 0 disables it).
+        self.response_cache = ResponseCache(os.path.join(self.state_dir, "http_cache"), ttl=cache_ttl,
+                                            max_bytes=cache_max_bytes) if cache_ttl else None
+        # Trending date of the current run, fixed once so every page and file of the run agree on it.
+        self.trending_date = time.strftime("%y.%d.%m")
+        # Journal of how far each region got, so an interrupted run can resume.
+        self.checkpoints = CheckpointStore(os.path.join(self.state_dir, "checkpoints"), self.trending_date)
         # Define a list of features to be extracted from the YouTube video snippet.
         self.snippet_features = ["title", "publishedAt", "channelId", "channelTitle", "categoryId"]
-        # Define a list of characters that should be avoided due to potential issues.
-        self.unsafe_characters = ['\n', '"']
         # Define the header for the data to be saved, including various attributes.
         self.header = ["video_id"] + self.snippet_features + ["trending_date", "tags", "view_count", "likes",
                                                               "dislikes", "comment_count", "thumbnail_link",
                                                               "comments_disabled", "ratings_disabled", "description"]
+        # Optionally add the channel subscriber count and the category name to every row, resolved
+        # through cached channels.list and videoCategories.list calls.
+        self.enricher = SnapshotEnricher(self, os.path.join(self.state_dir, "enrichment")) if enrich else None
+        if self.enricher is not None:
+            self.header = self.header + SnapshotEnricher.columns
+        # Optionally store each distinct description and tag string once, in a side table next to the snapshots,
+        # and keep only its hash in the snapshot rows.
+        self.text_indexes = [self.header.index(field) for field in text_fields]
+        self.text_store = TextStore(text_store_path(output_dir)) if text_store else None
+        if self.text_store is not None:
+            self.header = [f"{name}_hash" if name in text_fields else name for name in self.header]
+        # Ask the API for only the keys get_videos reads (the `fields` parameter), instead of the whole
+        # snippet with its localized copy and every thumbnail size.
+        self.field_mask = self.build_field_mask() if field_mask else None
+        # Bytes received and time spent decoding trending pages, to compare runs with and without the field
+        # mask. Tracker and enrichment answers are counted apart, so they do not skew the per-page figures.
+        self.stats = {"field_mask": bool(field_mask), "pages": 0, "cache_hits": 0, "wire_bytes": 0,
+                      "body_bytes": 0, "decode_seconds": 0.0, "other_responses": 0, "other_wire_bytes": 0}
+        self.stats_lock = threading.Lock()
 
-    def read_api_key(self, api_path):
-        # This function reads an API key from the specified file path.
-        # It expects the file to contain the API key as the first line.
-        
-        # Opens the specified file in read ('r') mode using a context manager.
-        with open(api_path, 'r') as file:
-            # Reads the first line of the file, which is assumed to contain the API key.
-            return file.readline()
-        
-        
     def read_country_codes(self, code_path):
         # This function reads country codes from a file located at 'code_path'.
         # It opens the file in a 'with' block to ensure proper resource management
@@ -43,44 +111,180 @@ class YouTubeDataScraper:
             # The result is a list containing the cleaned country codes.
             return [x.rstrip() for x in file]
 
-    def prepare_feature(self, feature):
-        # Iterate through each unsafe character and replace it with an empty string.
-        for ch in self.unsafe_characters:
-            feature = str(feature).replace(ch, "")
-        
-        # Return the sanitized feature enclosed in double quotes.
-        return f'"{feature}"'
+    def build_field_mask(self):
+        """
+        Build the `fields` parameter selecting only what get_videos reads from a page.
+
+        Returns:
+            str: The partial-response field mask.
+        """
+        snippet = self.snippet_features + ["tags", "description", "thumbnails/default/url"]
+        statistics = ["viewCount", "likeCount", "dislikeCount", "commentCount"]
+        return f"items(id,snippet({','.join(snippet)}),statistics({','.join(statistics)})),nextPageToken"
+
+    def decode_page(self, body, wire_bytes=None, cached=False):
+        # Decode a page and record its size and decode time in the scraper stats.
+        started = time.perf_counter()
+        page = decode_json(body)
+        elapsed = time.perf_counter() - started
+        with self.stats_lock:
+            self.stats["pages"] += 1
+            self.stats["cache_hits"] += int(cached)
+            self.stats["wire_bytes"] += len(body) if wire_bytes is None else wire_bytes
+            self.stats["body_bytes"] += len(body)
+            self.stats["decode_seconds"] += elapsed
+        return page
+
+    def decode_response(self, response, trending=False):
+        # Decode the raw body of a response; Content-Length is the compressed size when it was gzipped.
+        # Only trending pages go to the page stats; other answers (tracker, enrichment) are counted apart.
+        wire_bytes = int(response.headers.get("Content-Length", len(response.content)))
+        if trending:
+            return self.decode_page(response.content, wire_bytes)
+        with self.stats_lock:
+            self.stats["other_responses"] += 1
+            self.stats["other_wire_bytes"] += wire_bytes
+        return decode_json(response.content)
+
+    def stats_report(self):
+        """Return the scraper stats with per-page averages of bytes and decode time."""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        pages = max(stats["pages"], 1)
+        stats["wire_bytes_per_page"] = round(stats["wire_bytes"] / pages)
+        stats["body_bytes_per_page"] = round(stats["body_bytes"] / pages)
+        stats["decode_ms_per_page"] = round(stats["decode_seconds"] * 1000 / pages, 3)
+        stats["decode_seconds"] = round(stats["decode_seconds"], 4)
+        return stats
+
+    def call_api(self, method, url, params, region, priority, headers=None):
+        """
+        Make one API call with a key from the pool, charging it to the quota scheduler.
+
+        A key that is out of quota or refused with a 403 quota error is set aside for the run; a rate
+        limited key (HTTP 429) cools down for as long as its Retry-After header asks. The call is
+        repeated with the next key, waiting for a key to cool down when they all are rate limited,
+        until no key has quota left. Server and network errors are retried with the transport's backoff,
+        up to its max_retries. Every attempt, retries included, is charged to the scheduler.
+
+        Args:
+            method (str): The API method, e.g. "videos.list", used for quota costs.
+            url (str): The endpoint URL.
+            params (dict): Query parameters, without the key.
+            region (str): The region or job the call is charged to.
+            priority (int): One of the QuotaScheduler.PRIORITY_* levels.
+            headers (dict, optional): Extra headers, such as If-None-Match.
+
+        Returns:
+            requests.Response: The response of the call.
+
+        Raises:
+            QuotaExhausted: If no key can make the call.
+            TransportError: If the call keeps failing for another reason than throttling.
+        """
+        # Keys the scheduler refused for this call only (such as refresh calls eating into the scraping
+        # reserve); they stay usable for other calls.
+        refused = set()
+        # Server or network errors met so far.
+        attempt = 0
+        while True:
+            key = self.key_pool.acquire(exclude=refused)
+            try:
+                self.scheduler.acquire(method, key, region, priority)
+            except QuotaExhausted:
+                if self.scheduler.remaining(key) < self.scheduler.costs.get(method, 1):
+                    self.key_pool.mark_exhausted(key)
+                else:
+                    refused.add(key)
+                continue
+            # The transport makes a single attempt, so a retry goes through the scheduler and is charged again.
+            try:
+                response = self.transport.get(url, params=dict(params, key=key), headers=headers,
+                                              retry_rate_limits=False, max_retries=0)
+            except TransportError as error:
+                retry_after = self.transport.retry_after(error.response) if error.response is not None else None
+                self.key_pool.report_failure(key, error.response, retry_after)
+                if attempt == self.transport.max_retries:
+                    raise
+                delay = self.transport.backoff(attempt) if retry_after is None else retry_after
+                print(f"{error}, retrying in {delay:.1f}s (attempt {attempt + 1} of {self.transport.max_retries})")
+                attempt += 1
+                time.sleep(delay)
+                continue
+            if response.status_code in (403, 429) and \
+                    self.key_pool.report_failure(key, response, self.transport.retry_after(response)):
+                continue
+            return response
 
     def api_request(self, page_token, country_code):
-        # Construct the API request URL with necessary parameters
-        request_url = f"https://www.googleapis.com/youtube/v3/videos?part=id,statistics,snippet{page_token}" \
-                    f"chart=mostPopular&regionCode={country_code}&maxResults=50&key={self.api_key}"
-        
-        # Send a GET request to the constructed URL
-        request = requests.get(request_url)
-        
-        # Check if the request was rate-limited (HTTP 429)
-        if request.status_code == 429:
-            print("Temp-Banned due to excess requests, please wait and continue later")
-            sys.exit()  # Exit the program if rate-limited
-            
-        # Return the JSON response from the API
-        return request.json()
+        # Build the query parameters of the request; the first page has no page token.
+        params = {"part": "id,statistics,snippet", "chart": "mostPopular", "regionCode": country_code,
+                  "maxResults": 50}
+        if self.field_mask:
+            params["fields"] = self.field_mask
+        if page_token:
+            params["pageToken"] = page_token
+
+        # Serve a page stored earlier for the same trending date straight from disk while it is fresh;
+        # once stale, ask the server whether it changed by sending its ETag.
+        cache_key = cached = None
+        headers = None
+        if self.response_cache is not None:
+            endpoint = f"{self.api_url}?fields={self.field_mask or ''}"
+            cache_key = ResponseCache.key(endpoint, country_code, page_token, self.trending_date)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None and cached["fresh"]:
+                body = self.response_cache.read(cache_key)
+                if body is not None:
+                    return self.decode_page(body, wire_bytes=0, cached=True)
+                # Evicted by another region since the lookup: the page is fetched again.
+                cached = None
+            if cached is not None and cached["etag"]:
+                headers = {"If-None-Match": cached["etag"]}
+
+        # Send the GET request with a key from the pool, charged to the quota budget (first pages of a
+        # region are served before follow-up pages). The pooled session backs off and retries on rate
+        # limiting (HTTP 429) and server errors instead of exiting.
+        priority = QuotaScheduler.PRIORITY_PAGE if page_token else QuotaScheduler.PRIORITY_REGION
+        request = self.call_api("videos.list", self.api_url, params, country_code, priority, headers)
+
+        # The page did not change since it was stored: serve it from disk.
+        if request.status_code == 304 and cached is not None:
+            body = self.response_cache.read(cache_key) if self.response_cache.revalidate(cache_key) else None
+            if body is not None:
+                return self.decode_page(body, wire_bytes=0, cached=True)
+            # The stored page was evicted while the server was asked, so it is asked again without the ETag.
+            request = self.call_api("videos.list", self.api_url, params, country_code, priority)
+
+        # Any other answer than a page is an error the transport does not retry (400, 401, 404, or a 403 that
+        # is not about quota). Decoded as a page it would have no items and no next page token, and the region
+        # would be recorded as done with no videos; raising stops get_pages and leaves the region to resume.
+        if not 200 <= request.status_code < 300:
+            raise TransportError(f"HTTP {request.status_code} for {country_code}: {request.text[:200]}",
+                                 response=request)
+
+        # Store successful pages for later runs.
+        if request.status_code == 200 and cache_key is not None:
+            self.response_cache.put(cache_key, request.content, request.headers.get("ETag"))
+
+        # Decode the JSON response from the API, recording its size and decode time.
+        return self.decode_response(request, trending=True)
+
     def get_tags(self, tags_list):
         """
-        Takes a list of tags and prepares a feature using them.
+        Takes a list of tags and joins them into a single field.
 
         Args:
             tags_list (list): A list of tags to be joined.
 
         Returns:
-            feature (str): A prepared feature string created by joining the tags using a pipe ('|') separator.
+            feature (str): The tags joined using a pipe ('|') separator.
         """
-        return self.prepare_feature("|".join(tags_list))
+        return "|".join(tags_list)
 
     def get_videos(self, items):
-        # Initialize an empty list to store the lines of data for each video.
-        lines = []
+        # Yield the fields of each video one at a time, so a page is never copied into a list.
+        # Values are left as they come; the CSV writer handles quoting and escaping.
 
         # Iterate through each video in the 'items' list.
         for video in items:
@@ -92,31 +296,20 @@ class YouTubeDataScraper:
             if "statistics" not in video:
                 continue
 
-            # Extract the video ID and prepare it as a feature.
-            video_id = self.prepare_feature(video['id'])
-
             # Extract the 'snippet' and 'statistics' dictionaries from the video.
             snippet = video['snippet']
             statistics = video['statistics']
 
-            # Prepare selected features from the 'snippet' dictionary.
-            features = [self.prepare_feature(snippet.get(feature, "")) for feature in self.snippet_features]
+            # Select features from the 'snippet' dictionary.
+            features = [snippet.get(feature, "") for feature in self.snippet_features]
 
-            # Extract video description, thumbnail link, and format trending date.
+            # Extract video description and thumbnail link.
             description = snippet.get("description", "")
             thumbnail_link = snippet.get("thumbnails", dict()).get("default", dict()).get("url", "")
-            trending_date = time.strftime("%y.%d.%m")
 
-            # Get and prepare video tags.
+            # Get video tags.
             tags = self.get_tags(snippet.get("tags", ["[none]"]))
 
-            # Extract view count from 'statistics'.
-            view_count = statistics.get("viewCount", 0)
-
-            # Extract like and dislike counts from 'statistics'.
-            likes = statistics.get("likeCount", 0)
-            dislikes = statistics.get("dislikeCount", 0)
-
             # Check if the 'commentCount' key exists in 'statistics'.
             if 'commentCount' in statistics:
                 # If it exists, extract the comment count.
@@ -126,141 +319,254 @@ class YouTubeDataScraper:
                 comments_disabled = True
                 comment_count = 0
 
-            # Create a list containing various video-related data for the current video.
-            line = [video_id] + features + [self.prepare_feature(x) for x in
-                                            [trending_date, tags, view_count, likes, dislikes,
-                                            comment_count, thumbnail_link, comments_disabled,
-                                            ratings_disabled, description]]
+            # Yield the fields of the current video in header order.
+            yield [video['id']] + features + [self.trending_date, tags, statistics.get("viewCount", 0),
+                                              statistics.get("likeCount", 0), statistics.get("dislikeCount", 0),
+                                              comment_count, thumbnail_link, comments_disabled,
+                                              ratings_disabled, description]
 
-            # Join the list into a comma-separated string and append it to the 'lines' list.
-            lines.append(",".join(line))
-
-        # Return the list of formatted lines for all videos.
-        return lines
-    def get_pages(self, country_code, next_page_token="&"):
+    def get_pages(self, country_code, next_page_token=None):
         """
         Retrieve video data pages for a given country using YouTube API.
 
         Args:
             country_code (str): The country code for which video data is requested.
-            next_page_token (str, optional): Token for pagination. Defaults to "&".
+            next_page_token (str, optional): Token of the page to start from. Defaults to None (the first page).
 
-        Returns:
-            list: List of video data for the specified country.
+        Yields:
+            dict: One decoded API response page at a time.
 
         This method iterates through multiple pages of video data for a given country
-        using the YouTube API. It accumulates video data from each page and returns a
-        consolidated list of video information.
+        using the YouTube API. Pages are yielded as soon as they arrive, so only one page
+        is held in memory at a time.
 
         Note:
-        - This method relies on 'api_request' and 'get_videos' methods from the same class.
+        - This method relies on the 'api_request' method from the same class.
         - The 'country_code' parameter is used to specify the target country for the data.
-        - The 'next_page_token' parameter is used for pagination. It defaults to '&' for the first page.
+        - If a page still fails after all retries, iteration stops and the pages already yielded are kept.
 
         Example usage:
-        >> country_videos = get_pages("US")
-        >> print(country_videos)  # List of video data for the US country.
+        >> for page in get_pages("US"):
+        >>     print(page.get("nextPageToken"))
         """
-        country_data = []
-        while next_page_token is not None:
-
-            # Request video data for the current page using the YouTube API.
-            video_data_page = self.api_request(next_page_token, country_code)
-
-            # Extract the next page token for pagination, if available.
+        while True:
+            try:
+                # Request video data for the current page using the YouTube API.
+                video_data_page = self.api_request(next_page_token, country_code)
+            except (TransportError, QuotaExhausted) as error:
+                # Keep what was already written instead of throwing the whole region away.
+                print(f"Stopping {country_code} early, resume from this page on the next run: {error}")
+                return
+
+            yield video_data_page
+
+            # Extract the next page token for pagination; the last page has none.
             next_page_token = video_data_page.get("nextPageToken", None)
-            next_page_token = f"&pageToken={next_page_token}&" if next_page_token is not None else next_page_token
+            if next_page_token is None:
+                return
+
+    def snapshot_path(self, country_code, output_format=None, kind="videos"):
+        # Build the path of a region file for the current trending date; the extension follows the format
+        # and the kind is "videos" for full rows or "ranks" for deduplicated ones.
+        if self.layout == "hive":
+            return partition_path(self.output_dir, iso_date(self.trending_date), country_code,
+                                  output_format or self.output_format)
+        return os.path.join(self.output_dir,
+                            f"{self.trending_date}_{country_code}_{kind}.{output_format or self.output_format}")
+
+    def video_table_path(self):
+        # Build the path of the shared video table of the current trending date.
+        return os.path.join(self.output_dir, f"{self.trending_date}_videos.{self.output_format}")
+
+    def open_video_table(self):
+        """
+        Open the shared video table of the current date, keeping the videos an earlier run already stored.
 
-            # Extract video items from the current page and add them to the country_data list.
-            items = video_data_page.get('items', [])
-            country_data += self.get_videos(items)
+        A CSV table is appended to and its video ids are loaded into the per-run cache. A Parquet table
+        cannot be appended to, so it is started over and every region of the date is scraped again.
+        """
+        path = self.video_table_path()
+        writer_class = self.snapshot_writers[self.output_format]
+        self.seen_videos = set()
+        resume_from = None
+        if writer_class.resumable and os.path.exists(path):
+            self.seen_videos = set(pd.read_csv(path, usecols=["video_id"])["video_id"])
+            resume_from = os.path.getsize(path)
+        elif not writer_class.resumable:
+            self.checkpoints.reset()
+        self.video_table = writer_class(path, header=self.header, resume_from=resume_from)
+
+    def close_video_table(self):
+        # Close the shared video table at the end of a deduplicated run.
+        if self.video_table is not None:
+            self.video_table.close()
+            self.video_table = None
+
+    def deduplicate_rows(self, country_code, rows, first_rank):
+        """
+        Store the videos of a page in the shared video table once and return the region's rank rows.
+
+        Args:
+            country_code (str): The region the page belongs to.
+            rows (iterable): Full rows of the page, as yielded by get_videos.
+            first_rank (int): Chart position of the first video of the page (1 for the first page).
 
-        return country_data
+        Returns:
+            list: One [video_id, region, rank] row per video of the page.
+        """
+        rank_rows = []
+        new_rows = []
+        with self.video_table_lock:
+            for rank, row in enumerate(rows, start=first_rank):
+                rank_rows.append([row[0], country_code, rank])
+                # The snippet and description of a video already seen in this run are not written again.
+                if row[0] not in self.seen_videos:
+                    self.seen_videos.add(row[0])
+                    new_rows.append(row)
+            self.video_table.write_rows(new_rows)
+            # The videos must be on disk before the region records ranks that point at them.
+            self.video_table.flush()
+        return rank_rows
+
+    def write_to_file(self, country_code, country_data, output_format=None):
+        # Function to write country_data (an iterable of rows, as yielded by get_videos) to a CSV or Parquet
+        # file for a specific country_code, header included. Defaults to the scraper's output format.
+        output_format = output_format or self.output_format
 
-    def write_to_file(self, country_code, country_data):
-        # Function to write country_data to a CSV file for a specific country_code
-        
         # Display a message indicating that data is being written to file
         print(f"Writing {country_code} data to file...")
 
-        # Check if the output directory exists; if not, create it
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-
-        # Open a file for writing with a filename based on current time, country code, and format
-        with open(f"{self.output_dir}/{time.strftime('%y.%d.%m')}_{country_code}_videos.csv", "w+", encoding='utf-8') as file:
-            # Loop through each row in country_data and write it to the file
-            for row in country_data:
-                file.write(f"{row}\n")
-
-
+        # Stream the rows through the writer of the format; the output directory is created if needed.
+        writer_class = self.snapshot_writers[output_format]
+        with writer_class(self.snapshot_path(country_code, output_format), header=self.header) as writer:
+            writer.write_rows(country_data)
 
-    def get_data(self):
-        # This function retrieves data for each country code present in the 'country_codes' list.
-
-        for country_code in self.country_codes:
-            # Loop through each country code in the list.
-
-            # Create a list containing the header row as the first element, followed by data retrieved from pages.
-            country_data = [",".join(self.header)] + self.get_pages(country_code)
-
-            # Write the collected data for the current country to a file.
-            self.write_to_file(country_code, country_data)
-
-    def elist(self, folder_path):
-        # Initialize empty lists and dictionary to hold file paths, DataFrame names, and DataFrames
-        list0 = []  # List to store file paths
-        list1 = []  # List to generate DataFrame names
-        list2 = {}  # Dictionary to hold DataFrames with their respective names
-
-        # Get the list of contents (files) in the specified folder
-        folder_contents = os.listdir(folder_path)
-
-        # Loop through the files in the folder to create a list of their paths
-        for lists in folder_contents:
-            file_path = os.path.join(folder_path, lists)
-            list0.append(file_path)
-
-        # Generate DataFrame names based on indices and store them in list1
-        for i in range(len(list0)):
-            list1.append('df' + str(i))
+    def get_region(self, country_code):
+        """
+        Scrape every page of a single region and stream it to its own file.
 
-        # Loop through the list of DataFrame names and corresponding file paths
-        # Read CSV files and store them in the dictionary list2 with their names as keys
-        for i, name in enumerate(list1):
-            list2[name] = pd.read_csv(list0[i])
+        Pages are written as they arrive and progress is saved in the checkpoint journal after
+        every page, so a region that was finished is skipped by a restarted run and a partial one
+        resumes from its page token.
 
-        # Concatenate all DataFrames stored in the dictionary list2 along axis 0 (rows)
-        df = pd.concat(list2.values(), axis=0)
+        Args:
+            country_code (str): The country code of the region to scrape.
 
-        # Return the concatenated DataFrame
-        return df
+        Returns:
+            str: The country code, so concurrent callers can tell which region finished.
+        """
+        checkpoint = self.checkpoints.get(country_code)
+        if checkpoint.get("status") == "done":
+            print(f"Skipping {country_code}, already scraped for {self.trending_date}")
+            return country_code
+
+        kind, header = ("ranks", self.rank_header) if self.deduplicate else ("videos", self.header)
+        file_path = self.snapshot_path(country_code, kind=kind)
+        writer_class = self.snapshot_writers[self.output_format]
+        rows_written = 0
+        next_page_token = None
+        resume_from = None
+        if checkpoint.get("status") == "partial" and writer_class.resumable and os.path.exists(file_path):
+            # Continue from the recorded page, dropping rows written after the last checkpoint.
+            rows_written = checkpoint["rows_written"]
+            next_page_token = checkpoint["next_page_token"]
+            resume_from = checkpoint["bytes_written"]
+            print(f"Resuming {country_code} after {rows_written} videos")
 
-    def list_of_data(self, folder_path):
-        # Generate a list of file paths within the specified folder
-        file_paths = [os.path.join(folder_path, item) for item in os.listdir(folder_path)]
+        print(f"Writing {country_code} data to file...")
+        finished_rows = None
+        with writer_class(file_path, header=header, resume_from=resume_from) as writer:
+            for page in self.get_pages(country_code, next_page_token):
+                # Stream the rows of the page into the file, then record how far the region got.
+                rows = self.get_videos(page.get('items', []))
+                if self.enricher is not None:
+                    rows = self.enricher.enrich_rows(country_code, rows)
+                if self.text_store is not None:
+                    rows = self.text_store.intern_rows(rows, self.text_indexes)
+                if self.deduplicate:
+                    rows = self.deduplicate_rows(country_code, rows, rows_written + writer.rows_written + 1)
+                writer.write_rows(rows)
+                bytes_written = writer.flush()
+                if page.get("nextPageToken") is None and not writer_class.resumable:
+                    # A Parquet file is only readable once close() writes its footer, so the region is
+                    # recorded as done after the writer closed.
+                    finished_rows = rows_written + writer.rows_written
+                    continue
+                self.checkpoints.update(country_code, page.get("nextPageToken"),
+                                        rows_written + writer.rows_written, bytes_written)
+        if finished_rows is not None:
+            self.checkpoints.update(country_code, None, finished_rows, os.path.getsize(file_path))
+        return country_code
 
-        # Initialize a dictionary to map country codes to corresponding file paths
-        country_code_mapping = {'US': [], 'UK': [], 'GB': [], 'DE': [], 'CA': [], 'FR': [], 'KR': [], 'RU': [],
-                                'JP': [], 'BR': [], 'MX': [], 'IN': []}
+    def get_data(self):
+        # This function retrieves data for each country code present in the 'country_codes' list.
 
-        # Loop through each file path and assign it to the corresponding country code in the mapping
-        for file_path in file_paths:
-            for code in country_code_mapping:
-                if code in file_path.upper():  # Use upper() to handle case sensitivity
-                    country_code_mapping[code].append(file_path)
+        # Fix the trending date of this run and load the checkpoints an earlier run of the same day left.
+        self.trending_date = time.strftime("%y.%d.%m")
+        self.checkpoints = CheckpointStore(os.path.join(self.state_dir, "checkpoints"), self.trending_date)
+        if self.deduplicate:
+            self.open_video_table()
+        try:
+            self.scrape_regions()
+        finally:
+            self.close_video_table()
+            if self.enricher is not None:
+                self.enricher.save()
+            if self.response_cache is not None:
+                self.response_cache.save()
+            # Save how many API units this run spent and what it downloaded, even if it stopped early.
+            print(f"Scraper stats: {self.stats_report()}")
+            print(f"Quota report written to {self.write_report()}")
+
+    def track(self, tracker_dir=None, max_workers=None):
+        """
+        Tracker mode: refresh the statistics of every video seen in the output directory.
 
-        # Initialize a dictionary to store dataframes organized by country
-        dataframes_by_country = {}
+        Args:
+            tracker_dir (str, optional): Folder of the registry and time series. Defaults to "tracker"
+                next to the output directory.
+            max_workers (int, optional): Batches fetched at the same time. Defaults to 8.
 
-        # Loop through each country code and associated filenames
-        for country_code, filenames in country_code_mapping.items():
-            # Read each CSV file into a dataframe and store them in a list
-            dataframes = [pd.read_csv(filename) for filename in filenames]
-            # Concatenate the dataframes along the rows to combine the data
-            dataframes_by_country[country_code] = pd.concat(dataframes, axis=0)
-        # Return the dictionary containing dataframes organized by country
-        return dataframes_by_country
+        Returns:
+            int: Number of (video_id, timestamp, views, likes, comments) rows appended.
+        """
+        try:
+            return VideoTracker(self, tracker_dir, max_workers).refresh()
+        finally:
+            # Save how many API units the refresh spent.
+            print(f"Quota report written to {self.write_report()}")
+
+    def write_report(self):
+        # Save the quota usage of the run, with the scraper stats and the health of each key.
+        return self.scheduler.write_report(extra={"scraper": self.stats_report(), "keys": self.key_pool.report()})
+
+    def scrape_regions(self):
+        # Scrape every region, one after the other or on a pool of threads.
+        if self.max_workers == 1:
+            for country_code in self.country_codes:
+                # Loop through each country code in the list.
+                self.get_region(country_code)
+            return
+
+        # Pages of one region are chained through nextPageToken, so they are fetched in order,
+        # but the regions themselves are independent and run on a bounded pool of threads.
+        # The wall-clock time is then roughly that of the slowest region.
+        workers = min(self.max_workers, len(self.country_codes))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.get_region, code): code for code in self.country_codes}
+            for future in as_completed(futures):
+                # Re-raise any error from the worker thread here in the caller.
+                future.result()
+
+    def elist(self, folder_path, columns=None, start=None, end=None, regions=None, max_workers=None):
+        # Get the region snapshots in the specified folder (flat or partitioned), only for the requested dates,
+        # regions and columns, as one typed DataFrame; see loading.elist, which needs no scraper
+        return elist(folder_path, columns, start, end, regions, max_workers)
+
+    def list_of_data(self, folder_path, columns=None, start=None, end=None, regions=None, max_workers=None):
+        # Get the region snapshots in the specified folder as one typed DataFrame per country code;
+        # see loading.list_of_data, which needs no scraper
+        return list_of_data(folder_path, columns, start, end, regions, max_workers)
 
     def save_dataframe(self, save_data_name, folder_path, data):
         """
@@ -275,38 +581,157 @@ class YouTubeDataScraper:
         file_path = os.path.join(folder_path, f"{save_data_name}.csv")  # Construct the full file path
         data.to_csv(file_path, index=False)  # Save the DataFrame to CSV format without index
 
-    def run(self):
+    def consolidate(self, folder_path, data_dir, columns=None, max_workers=None, incremental=True):
+        """
+        Build Total_data.csv and list_of_data/{code}.csv from the snapshots of a folder in a single pass.
+
+        Every snapshot is parsed once, with several files read at the same time, and each one is appended
+        to the total file and to the file of its country before the next ones are read. Only a few
+        snapshots are held in memory at any time, instead of the whole dataset twice (once for the total
+        and once more for the countries).
+
+        A manifest in the state folder records the size, modification time and hash of every snapshot
+        already folded in. When only new snapshots arrived, they are appended to the existing datasets.
+        When a recorded snapshot changed or disappeared, or a dataset is not as the last pass left it,
+        everything is rebuilt under temporary names that are moved into place at the end, so a failed
+        rebuild leaves the previous datasets untouched.
+
+        Args:
+            folder_path (str): The output folder holding the snapshots.
+            data_dir (str): Folder of Total_data.csv and of the list_of_data folder.
+            columns (list, optional): Only keep these columns. Defaults to None (every column found in the
+                snapshots; a snapshot without some of them gets empty fields).
+            max_workers (int, optional): Number of files read at the same time. Defaults to the CPU count
+                (at most 8).
+            incremental (bool, optional): Append new snapshots when possible. False always rebuilds.
+                Defaults to True.
+
+        Returns:
+            dict: Number of rows written in this pass per dataset name ("Total_data" and each country code).
+        """
+        files = snapshot_files(folder_path)
+        country_dir = os.path.join(data_dir, "list_of_data")
+        os.makedirs(country_dir, exist_ok=True)
+        workers = max_workers or min(8, os.cpu_count() or 1)
+        video_tables = {}  # Shared video tables of deduplicated dates, read once
+
+        # Compare the snapshots with the manifest of the last pass to find the ones still to fold in.
+        manifest = ConsolidationManifest(os.path.join(self.state_dir, "consolidation"))
+        names = {file_path: os.path.relpath(file_path, folder_path).replace(os.sep, "/") for file_path, _ in files}
+        fingerprints = {names[file_path]: manifest.fingerprint(file_path, names[file_path]) for file_path, _ in files}
+        # Every snapshot is written with one fixed column list (the requested columns, or every column found in
+        # the snapshots), so files with more or fewer columns, such as enriched ones, stay aligned under the
+        # header. The list is part of the settings, so a snapshot bringing a new column rebuilds the datasets.
+        output_columns = list(columns) if columns else \
+            list(dict.fromkeys(column for file_path, _ in files for column in snapshot_header(file_path)))
+        settings = {"data_dir": os.path.abspath(data_dir), "columns": output_columns, "quoting": "all",
+                    "types": "pinned"}
+        rebuild, new_names = manifest.plan(fingerprints, settings) if incremental else (True, list(fingerprints))
+        new_names = set(new_names)
+        pending = [file for file in files if names[file[0]] in new_names]
+        if rebuild:
+            print(f"Rebuilding the consolidated datasets from {len(pending)} snapshots")
+        else:
+            print(f"Appending {len(pending)} new snapshots to the consolidated datasets")
+
+        # Path, rows and bytes of every dataset; a rebuild starts from nothing and writes to temporary files.
+        datasets = {} if rebuild else manifest.entries.get("datasets", {})
+        outputs = {}
+        rows_written = {}
+
+        def target_path(name):
+            # Final path of a dataset, and the path written to during this pass.
+            path = os.path.join(data_dir, "Total_data.csv") if name == "Total_data" else \
+                os.path.join(country_dir, f"{name}.csv")
+            return path, f"{path}.tmp" if rebuild else path
+
+        def serialize(file):
+            # Parse one snapshot and turn it into CSV text once; the same text goes to both of its datasets.
+            # The consolidated datasets carry the texts, even when the snapshots only hold their hashes.
+            # Snapshots are read with the pinned types, so counts and timestamps are written the same way
+            # whether they come from a CSV or a Parquet snapshot.
+            data = attach_texts(load_snapshot(file[0], stored_columns(output_columns), video_tables, typed=True),
+                                folder_path, output_columns)
+            data = data.reindex(columns=output_columns)
+            # Every field is quoted, as in the snapshots: descriptions can hold a bare carriage return, which
+            # the minimal quoting of to_csv leaves unquoted and which readers take for the end of a row.
+            return (data.head(0).to_csv(index=False, quoting=csv.QUOTE_ALL),
+                    data.to_csv(index=False, header=False, quoting=csv.QUOTE_ALL), len(data))
+
+        def append(name, header, body, rows):
+            # Append a snapshot to a dataset, with the header when the dataset file is new.
+            if name not in outputs:
+                path, write_path = target_path(name)
+                if name in datasets:
+                    outputs[name] = open(write_path, "a", encoding="utf-8", newline="")
+                else:
+                    outputs[name] = open(write_path, "w", encoding="utf-8", newline="")
+                    outputs[name].write(header)
+                    datasets[name] = {"path": os.path.abspath(path), "rows": 0, "bytes": 0}
+                rows_written[name] = 0
+            outputs[name].write(body)
+            rows_written[name] += rows
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Read the files a window at a time and write them in order, so the output is deterministic
+                # and memory holds one window of snapshots.
+                for start in range(0, len(pending), workers):
+                    window = pending[start:start + workers]
+                    for (file_path, code), snapshot in zip(window, executor.map(serialize, window)):
+                        append("Total_data", *snapshot)
+                        append(code, *snapshot)
+        except BaseException:
+            for name, output in outputs.items():
+                output.close()
+                if rebuild:
+                    os.remove(target_path(name)[1])
+            # An interrupted append leaves datasets bigger than the manifest says, so the next pass rebuilds.
+            raise
+
+        # Move every rebuilt dataset into place and record what the datasets now hold.
+        for name, output in outputs.items():
+            output.close()
+            path, write_path = target_path(name)
+            if rebuild:
+                os.replace(write_path, path)
+            datasets[name]["rows"] += rows_written[name]
+            datasets[name]["bytes"] = os.path.getsize(path)
+        manifest.record(fingerprints, datasets, settings)
+        return rows_written
+
+    def run(self, data_dir=None):
+        """
+        Scrape today's trending videos, then rebuild the consolidated datasets from every snapshot.
+
+        Args:
+            data_dir (str, optional): Folder of Total_data.csv and list_of_data/. Defaults to the folder
+                of this script (notebooks/data).
+        """
         # Call the method "get_data" to retrieve some data.
         self.get_data()
 
-        # Define the path to a total folder where data will be saved.
-        total_folder_path = r'C:\Users\atulk\PycharmProjects\pythonProject2\M_L\Youtube_Views_Prediction\notebooks\data'
-        
-        # Save a dataframe named 'Total_data' to the specified folder.
-        # The data is obtained from the 'elist' method within the 'output_dir'.
-        self.save_dataframe(save_data_name='Total_data', folder_path=total_folder_path,
-                            data=self.elist(self.output_dir))
-        folder_path=r'C:\Users\atulk\PycharmProjects\pythonProject2\M_L\Youtube_Views_Prediction\notebooks\data\list_of_data'
-        # Obtain a dictionary of dataframes categorized by country code.
-        dataframes_by_country = self.list_of_data(self.output_dir)
-        
-        # Iterate through each country code and its corresponding dataframe.
-        for country_code, dataframe in dataframes_by_country.items():
-            # Save the specific country's dataframe to the total folder.
-            self.save_dataframe(save_data_name=country_code, folder_path=folder_path,
-                                data=dataframe)
+        # Save 'Total_data' and one dataframe per country code, all built from a single read of 'output_dir'
+        # and extended with only the snapshots that arrived since the last run.
+        data_dir = data_dir or os.path.dirname(os.path.abspath(__file__))
+        rows_written = self.consolidate(self.output_dir, data_dir)
+        countries = [name for name in rows_written if name != "Total_data"]
+        print(f"Consolidated {rows_written.get('Total_data', 0)} new rows into {len(countries)} countries")
 
 # Entry point of the script
 if __name__ == "__main__":
-    # Define the file paths for the API key and country codes
-    api_key_path = r'C:\Users\atulk\PycharmProjects\pythonProject2\M_L\Youtube_Views_Prediction\notebooks\data\api_key.txt'
-    country_code_path = r'C:\Users\atulk\PycharmProjects\pythonProject2\M_L\Youtube_Views_Prediction\notebooks\data\country_codes.txt'
-
-    # Define the output directory path
-    output_dir = r'C:\Users\atulk\PycharmProjects\pythonProject2\M_L\Youtube_Views_Prediction\output'
-
-    # Create an instance of YouTubeDataScraper with the specified paths
-    scraper = YouTubeDataScraper(api_key_path=api_key_path, country_code_path=country_code_path, output_dir=output_dir)
+    # Define the file paths for the API key and country codes, which live next to this script
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    api_key_path = os.path.join(data_dir, 'api_key.txt')
+    country_code_path = os.path.join(data_dir, 'country_codes.txt')
+
+    # Define the output directory path, at the root of the repository
+    output_dir = os.path.join(data_dir, '..', '..', 'output')
+
+    # Create an instance of YouTubeDataScraper with the specified paths,
+    # scraping up to four regions at the same time.
+    scraper = YouTubeDataScraper(api_key_path=api_key_path, country_code_path=country_code_path, output_dir=output_dir,
+                                 max_workers=4)
     
     # Run the YouTube data scraper to collect information
     scraper.run()
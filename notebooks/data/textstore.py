@@ -0,0 +1,140 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+
+from writers import CsvSnapshotWriter, ParquetSnapshotWriter
+
+
+def text_hash(text):
+    """Return the content address of a text: the first 16 hex characters of its SHA-256."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class TextStore:
+    """
+    A content-addressed side table for the long text fields of the snapshots (descriptions and tags).
+
+    The same video repeats its description and tags on every trending day and in every region, so each
+    distinct text is stored once in a SQLite table keyed by its hash, and snapshots only keep the hash.
+    Readers look texts up by hash when a text feature is asked for.
+    """
+
+    # Largest number of parameters per lookup query, under SQLite's default limit of 999.
+    batch_size = 500
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared by the scraper threads, serialized by a lock.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS texts (hash TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        self.connection.commit()
+
+    def intern(self, texts):
+        """
+        Store texts that are not stored yet and return their hashes.
+
+        Args:
+            texts (list): The texts; None is kept as None.
+
+        Returns:
+            list: The hash of each text, in the same order.
+        """
+        hashes = [None if text is None else text_hash(str(text)) for text in texts]
+        entries = {hashed: str(text) for hashed, text in zip(hashes, texts) if hashed is not None}
+        with self.lock:
+            self.connection.executemany("INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", entries.items())
+            self.connection.commit()
+        return hashes
+
+    def intern_rows(self, rows, indexes):
+        """
+        Replace the text fields of a page of rows by their hashes, storing the texts.
+
+        Args:
+            rows (iterable): Rows of the page, as yielded by get_videos.
+            indexes (list): Positions of the text fields in a row.
+
+        Returns:
+            list: The rows with hashes in place of the texts.
+        """
+        rows = [list(row) for row in rows]
+        for index in indexes:
+            for row, hashed in zip(rows, self.intern([row[index] for row in rows])):
+                row[index] = hashed
+        return rows
+
+    def lookup(self, hashes):
+        """
+        Return the texts of the given hashes.
+
+        Args:
+            hashes (iterable): Hashes to resolve.
+
+        Returns:
+            dict: Text by hash, for the hashes found in the store.
+        """
+        hashes = list(dict.fromkeys(hashes))
+        texts = {}
+        with self.lock:
+            for start in range(0, len(hashes), self.batch_size):
+                batch = hashes[start:start + self.batch_size]
+                query = f"SELECT hash, text FROM texts WHERE hash IN ({','.join('?' * len(batch))})"
+                texts.update(self.connection.execute(query, batch).fetchall())
+        return texts
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def convert_snapshots(source_dir, target_dir):
+    """
+    Rewrite the region snapshots of a folder with their descriptions and tags moved to a text store.
+
+    Each file is written under the same name in `target_dir` (deduplicated region files are joined with
+    their video table and written as full region files), with description_hash and tags_hash columns,
+    and the texts go to target_dir/texts.sqlite.
+
+    Args:
+        source_dir (str): Folder of the snapshots with full texts.
+        target_dir (str): Folder of the converted snapshots.
+
+    Returns:
+        int: Number of files converted.
+    """
+    # loading reads text stores through this module, so it is imported once both are loaded.
+    from loading import load_snapshot, snapshot_files, text_fields, text_store_path
+
+    store = TextStore(text_store_path(target_dir))
+    converted = 0
+    try:
+        for file_path, _ in snapshot_files(source_dir):
+            data = load_snapshot(file_path)
+            header = list(data.columns)
+            rows = data.astype(object).where(data.notna(), None).values.tolist()
+            indexes = [header.index(field) for field in text_fields if field in header]
+            rows = store.intern_rows(rows, indexes)
+            header = [f"{name}_hash" if name in text_fields else name for name in header]
+            target_path = os.path.join(target_dir, os.path.relpath(file_path, source_dir))
+            # Deduplicated region files come out with full rows, so they are named as full region files.
+            target_path = target_path.replace("_ranks.", "_videos.")
+            writer_class = ParquetSnapshotWriter if file_path.endswith(".parquet") else CsvSnapshotWriter
+            with writer_class(target_path, header=header) as writer:
+                writer.write_rows(rows)
+            converted += 1
+    finally:
+        store.close()
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move snapshot descriptions and tags to a content-addressed store")
+    parser.add_argument("--source", default=os.path.join("..", "..", "output"))
+    parser.add_argument("--target", default=os.path.join("..", "..", "output_texts"))
+    args = parser.parse_args()
+
+    print(f"Converted {convert_snapshots(args.source, args.target)} snapshot files to {args.target}")
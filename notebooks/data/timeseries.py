@@ -0,0 +1,240 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from loading import load_snapshot, snapshot_date, snapshot_files
+
+
+class SnapshotCompactor:
+    """
+    Turn the dated region snapshots into delta-encoded time series stored in SQLite.
+
+    Consecutive days mostly hold the same videos with slightly higher counters, so instead of keeping
+    every daily row the compactor stores:
+    - `videos`: the full record of each video (title, channel, tags, ...) the first time it is seen,
+    - `records`: the counters of each (video, region) series on the first date it trended there,
+    - `deltas`: for later dates, only the changes of view_count, likes and comment_count, and only
+      when at least one of them moved,
+    - `appearances`: which videos trended in which region on each date, with their rank.
+
+    Any date's snapshot is rebuilt by adding up the deltas up to that date, and the trajectory of a video
+    is a single indexed range query, instead of re-reading every daily file. Text fields keep the value
+    first seen; the counters are reproduced exactly.
+    """
+
+    # Counters stored as deltas; dislikes are no longer published, so they stay in the first record only.
+    delta_columns = ["view_count", "likes", "comment_count"]
+    record_columns = ["view_count", "likes", "dislikes", "comment_count"]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                video_id TEXT, region TEXT, first_date TEXT,
+                view_count INTEGER, likes INTEGER, dislikes INTEGER, comment_count INTEGER,
+                PRIMARY KEY (video_id, region));
+            CREATE TABLE IF NOT EXISTS deltas (
+                video_id TEXT, region TEXT, date TEXT,
+                view_count INTEGER, likes INTEGER, comment_count INTEGER,
+                PRIMARY KEY (video_id, region, date));
+            CREATE TABLE IF NOT EXISTS appearances (
+                date TEXT, region TEXT, rank INTEGER, video_id TEXT,
+                PRIMARY KEY (date, region, rank));
+            CREATE TABLE IF NOT EXISTS compacted_files (name TEXT PRIMARY KEY, date TEXT, region TEXT);
+        """)
+
+    def static_columns(self):
+        # Columns of the videos table, which is created from the header of the first snapshot compacted.
+        return [row[1] for row in self.connection.execute("PRAGMA table_info(videos)")][1:]
+
+    def create_videos_table(self, columns):
+        # Every column that is neither the key, a counter nor the trending date is kept as text.
+        definitions = ", ".join(f'"{name}" TEXT' for name in columns)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS videos (video_id TEXT PRIMARY KEY, {definitions})")
+
+    def reset(self):
+        """Drop every compacted series, so the next compaction starts over."""
+        for table in ("records", "deltas", "appearances", "compacted_files"):
+            self.connection.execute(f"DELETE FROM {table}")
+        self.connection.execute("DROP TABLE IF EXISTS videos")
+        self.connection.commit()
+
+    def latest_counters(self):
+        # Current value of every (video, region) series: first record plus every delta so far.
+        query = f"""
+            SELECT r.video_id, r.region, COALESCE(MAX(d.date), r.first_date),
+                   {', '.join(f'r.{name} + COALESCE(SUM(d.{name}), 0)' for name in self.delta_columns)}
+            FROM records r LEFT JOIN deltas d ON d.video_id = r.video_id AND d.region = r.region
+            GROUP BY r.video_id, r.region"""
+        return {(video_id, region): (date, tuple(values))
+                for video_id, region, date, *values in self.connection.execute(query)}
+
+    def compact(self, folder_path):
+        """
+        Add the snapshots of a folder that were not compacted yet.
+
+        Files are taken in date order. A snapshot older than what is already compacted cannot be added
+        as a delta, so in that case everything is compacted again from the start.
+
+        Args:
+            folder_path (str): The output folder.
+
+        Returns:
+            int: Number of snapshot files compacted.
+        """
+        done = {name for name, in self.connection.execute("SELECT name FROM compacted_files")}
+        last_date = self.connection.execute("SELECT MAX(date) FROM compacted_files").fetchone()[0]
+        pending = []
+        for file_path, region in snapshot_files(folder_path):
+            name = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+            if name not in done:
+                date = snapshot_date(file_path)
+                pending.append((date, region, name, file_path))
+        if last_date and any(date < last_date for date, *_ in pending):
+            print("A snapshot older than the compacted series arrived, compacting everything again")
+            self.reset()
+            return self.compact(folder_path)
+
+        latest = self.latest_counters()
+        video_ids = {video_id for video_id, in self.connection.execute("SELECT video_id FROM records")}
+        for date, region, name, file_path in sorted(pending):
+            data = load_snapshot(file_path, typed=True)
+            if not self.static_columns():
+                self.create_videos_table([column for column in data.columns if column not in self.record_columns
+                                          and column not in ("video_id", "trending_date")])
+            static_columns = self.static_columns()
+            data = data.reindex(columns=["video_id"] + static_columns + self.record_columns)
+            data[self.record_columns] = data[self.record_columns].fillna(0).astype("int64")
+
+            videos, records, deltas, appearances = [], [], [], []
+            for rank, row in enumerate(data.itertuples(index=False, name=None), start=1):
+                video_id = row[0]
+                counters = dict(zip(self.record_columns, row[-len(self.record_columns):]))
+                appearances.append((date, region, rank, video_id))
+                if video_id not in video_ids:
+                    video_ids.add(video_id)
+                    videos.append((video_id,) + tuple(None if pd.isna(value) else str(value)
+                                                      for value in row[1:1 + len(static_columns)]))
+                values = tuple(int(counters[name]) for name in self.delta_columns)
+                previous = latest.get((video_id, region))
+                if previous is None:
+                    records.append((video_id, region, date) + tuple(int(counters[name])
+                                                                    for name in self.record_columns))
+                elif previous[0] < date and values != previous[1]:
+                    deltas.append((video_id, region, date) + tuple(new - old for new, old in zip(values, previous[1])))
+                else:
+                    # Unchanged counters (or a repeat of the video on the same date) store nothing.
+                    continue
+                latest[(video_id, region)] = (date, values)
+
+            placeholders = ", ".join("?" * (1 + len(static_columns)))
+            self.connection.executemany(f"INSERT OR IGNORE INTO videos VALUES ({placeholders})", videos)
+            self.connection.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+            self.connection.executemany("INSERT INTO deltas VALUES (?, ?, ?, ?, ?, ?)", deltas)
+            self.connection.executemany("INSERT OR REPLACE INTO appearances VALUES (?, ?, ?, ?)", appearances)
+            self.connection.execute("INSERT INTO compacted_files VALUES (?, ?, ?)", (name, date, region))
+            # One transaction per file, so an interrupted compaction resumes at the file it stopped in.
+            self.connection.commit()
+        return len(pending)
+
+    def snapshot(self, date, regions=None):
+        """
+        Rebuild the snapshot of a date from the first records and the deltas up to that date.
+
+        Args:
+            date (str): The trending date, as YYYY-MM-DD.
+            regions (iterable, optional): Country codes to rebuild. Defaults to None (every region).
+
+        Returns:
+            pandas.DataFrame: One row per video and region, in chart order, with the snapshot columns
+            plus a "region" column.
+        """
+        static_columns = self.static_columns()
+        region_filter = ""
+        params = [date, date]
+        if regions:
+            regions = list(regions)
+            region_filter = f"AND a.region IN ({', '.join('?' * len(regions))})"
+            params += regions
+        counters = ", ".join(f"r.{name} + COALESCE(SUM(d.{name}), 0) AS {name}" if name in self.delta_columns
+                             else f"r.{name}" for name in self.record_columns)
+        query = f"""
+            SELECT a.region, a.video_id, {', '.join(f'v."{name}"' for name in static_columns)}, {counters}
+            FROM appearances a
+            JOIN records r ON r.video_id = a.video_id AND r.region = a.region
+            JOIN videos v ON v.video_id = a.video_id
+            LEFT JOIN deltas d ON d.video_id = a.video_id AND d.region = a.region AND d.date <= ?
+            WHERE a.date = ? {region_filter}
+            GROUP BY a.region, a.rank
+            ORDER BY a.region, a.rank"""
+        data = pd.read_sql_query(query, self.connection, params=params)
+        data.insert(2, "trending_date", datetime.strptime(date, "%Y-%m-%d").strftime("%y.%d.%m"))
+        return data
+
+    def history(self, video_ids, start=None, end=None, regions=None):
+        """
+        Return the counters of videos on every date they were observed, from the compacted series.
+
+        Args:
+            video_ids (str or list): One video id or several.
+            start (str, optional): First date to return, as YYYY-MM-DD. Defaults to None.
+            end (str, optional): Last date to return, as YYYY-MM-DD. Defaults to None.
+            regions (iterable, optional): Country codes to return. Defaults to None (every region).
+
+        Returns:
+            pandas.DataFrame: video_id, region, date and the counters, one row per change, sorted by date.
+        """
+        video_ids = [video_ids] if isinstance(video_ids, str) else list(video_ids)
+        placeholders = ", ".join("?" * len(video_ids))
+        columns = ", ".join(self.delta_columns)
+        # The first record and the deltas are read in one indexed query; running sums give the values.
+        query = f"""
+            SELECT video_id, region, first_date AS date, {columns} FROM records WHERE video_id IN ({placeholders})
+            UNION ALL
+            SELECT video_id, region, date, {columns} FROM deltas WHERE video_id IN ({placeholders})
+            ORDER BY video_id, region, date"""
+        data = pd.read_sql_query(query, self.connection, params=video_ids + video_ids)
+        data[self.delta_columns] = data.groupby(["video_id", "region"])[self.delta_columns].cumsum()
+        if start:
+            data = data[data["date"] >= start]
+        if end:
+            data = data[data["date"] <= end]
+        if regions:
+            data = data[data["region"].isin(list(regions))]
+        return data.reset_index(drop=True)
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delta-encoded time series of the trending snapshots")
+    parser.add_argument("--output-dir", default=os.path.join("..", "..", "output"))
+    parser.add_argument("--db", default=os.path.join("..", "..", "timeseries.sqlite"))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compact", help="Add the snapshots not compacted yet")
+    snapshot = subparsers.add_parser("snapshot", help="Rebuild the snapshot of a date")
+    snapshot.add_argument("date", help="YYYY-MM-DD")
+    snapshot.add_argument("--region", action="append")
+    history = subparsers.add_parser("history", help="Show the counters of videos over time")
+    history.add_argument("video_ids", nargs="+")
+    history.add_argument("--start")
+    history.add_argument("--end")
+    args = parser.parse_args()
+
+    compactor = SnapshotCompactor(args.db)
+    started = time.perf_counter()
+    if args.command == "compact":
+        print(f"Compacted {compactor.compact(args.output_dir)} snapshot files")
+    elif args.command == "snapshot":
+        print(compactor.snapshot(args.date, args.region))
+    elif args.command == "history":
+        print(compactor.history(args.video_ids, args.start, args.end).to_string(index=False))
+    print(f"Done in {time.perf_counter() - started:.3f}s")
+    compactor.close()
@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from atomic import save_json_atomic
+from checkpoint import CheckpointStore
+from loading import load_snapshot, snapshot_date, snapshot_files
+from quota import QuotaExhausted, QuotaScheduler
+from transport import TransportError
+from writers import CsvSnapshotWriter
+
+
+class VideoTracker:
+    """
+    Follow the statistics of every video that ever trended, after it stops trending.
+
+    The tracker keeps a registry of the video ids found in the snapshot files of output/ and refreshes
+    their statistics with `videos.list?id=...`, 50 ids per call, so one unit of quota refreshes 50 videos.
+    Batches are fetched concurrently on the scraper's pooled session, at refresh priority in the quota
+    scheduler, and each refresh appends compact (video_id, timestamp, views, likes, comments) rows to a
+    time-series CSV.
+    """
+
+    # Largest number of ids the API accepts in one videos.list call.
+    batch_size = 50
+    # Batches fetched at the same time; the scraper's connection pool is sized for them.
+    max_workers = 8
+    header = ["video_id", "timestamp", "view_count", "likes", "comment_count"]
+
+    def __init__(self, scraper, tracker_dir=None, max_workers=None):
+        """
+        Args:
+            scraper (YouTubeDataScraper): Provides the output folder, key, session and quota scheduler.
+            tracker_dir (str, optional): Folder of the registry and the time series.
+                Defaults to a "tracker" folder next to the output folder.
+            max_workers (int, optional): Batches fetched at the same time. Defaults to 8.
+        """
+        self.scraper = scraper
+        self.max_workers = max(1, int(max_workers or self.max_workers))
+        self.tracker_dir = tracker_dir or os.path.join(os.path.dirname(os.path.abspath(scraper.output_dir)),
+                                                       "tracker")
+        self.registry_path = os.path.join(self.tracker_dir, "registry.json")
+        self.stats_path = os.path.join(self.tracker_dir, "video_stats.csv")
+        self.registry = self.load_registry()
+
+    def load_registry(self):
+        # Read the video ids and the snapshot files already scanned by earlier runs.
+        if not os.path.exists(self.registry_path):
+            return {"files": [], "video_ids": []}
+        with open(self.registry_path, encoding="utf-8") as file:
+            return json.load(file)
+
+    def save_registry(self):
+        save_json_atomic(self.registry_path, self.registry)
+
+    def is_finished(self, file_path, region, journals):
+        # A snapshot whose region checkpoint is not done yet is still being written and may grow, so it is
+        # read again on the next run. Dates without a checkpoint journal are history and count as done.
+        date = datetime.strptime(snapshot_date(file_path), "%Y-%m-%d").strftime("%y.%d.%m")
+        if date not in journals:
+            journals[date] = CheckpointStore(os.path.join(self.scraper.state_dir, "checkpoints"), date)
+        checkpoints = journals[date]
+        return not os.path.exists(checkpoints.path) or checkpoints.get(region).get("status") == "done"
+
+    def update_registry(self):
+        """
+        Add the video ids of snapshot files that were not scanned yet to the registry.
+
+        Files the scraper has not finished are read but not recorded as scanned, so the rows appended
+        to them later are picked up by the next run.
+
+        Returns:
+            int: Number of video ids in the registry.
+        """
+        scanned = set(self.registry["files"])
+        video_ids = dict.fromkeys(self.registry["video_ids"])
+        folder_path = self.scraper.output_dir
+        journals = {}  # Checkpoint journals by trending date, read once
+        for file_path, region in snapshot_files(folder_path):
+            # Files are recorded by their path under the output folder, which is the bare name in the flat layout.
+            name = os.path.relpath(file_path, folder_path).replace(os.sep, "/")
+            # Skip files already scanned.
+            if name in scanned:
+                continue
+            # Only the video_id column is read from each snapshot.
+            snapshot = load_snapshot(file_path, columns=["video_id"])
+            video_ids.update(dict.fromkeys(snapshot["video_id"].dropna()))
+            if self.is_finished(file_path, region, journals):
+                self.registry["files"].append(name)
+        self.registry["video_ids"] = list(video_ids)
+        self.save_registry()
+        return len(self.registry["video_ids"])
+
+    def fetch_batch(self, video_ids):
+        """
+        Fetch the current statistics of up to 50 videos with a single videos.list call.
+
+        Args:
+            video_ids (list): The ids to refresh.
+
+        Returns:
+            list: One [video_id, timestamp, views, likes, comments] row per video the API still knows.
+
+        Raises:
+            TransportError: If the API answers with an error, so the batch is reported as skipped.
+        """
+        params = {"part": "statistics", "id": ",".join(video_ids), "maxResults": self.batch_size}
+        if self.scraper.field_mask:
+            params["fields"] = "items(id,statistics(viewCount,likeCount,commentCount))"
+        response = self.scraper.call_api("videos.list", self.scraper.api_url, params, "tracker",
+                                         QuotaScheduler.PRIORITY_REFRESH)
+        if response.status_code != 200:
+            raise TransportError(f"HTTP {response.status_code} for a batch of {len(video_ids)} videos: "
+                                 f"{response.text[:200]}", response=response)
+        page = self.scraper.decode_response(response)
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        rows = []
+        for video in page.get("items", []):
+            statistics = video.get("statistics", {})
+            rows.append([video["id"], timestamp, statistics.get("viewCount", 0), statistics.get("likeCount", 0),
+                         statistics.get("commentCount", 0)])
+        return rows
+
+    def refresh(self):
+        """
+        Refresh every registered video and append the results to the time series.
+
+        Stops early, keeping what was fetched, if the quota runs out or requests keep failing.
+
+        Returns:
+            int: Number of rows appended.
+        """
+        self.update_registry()
+        video_ids = self.registry["video_ids"]
+        batches = [video_ids[start:start + self.batch_size] for start in range(0, len(video_ids), self.batch_size)]
+        print(f"Refreshing {len(video_ids)} videos in {len(batches)} batches...")
+
+        resume_from = os.path.getsize(self.stats_path) if os.path.exists(self.stats_path) else None
+        with CsvSnapshotWriter(self.stats_path, header=self.header, resume_from=resume_from) as writer, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_batch, batch) for batch in batches]
+            for future in futures:
+                try:
+                    writer.write_rows(future.result())
+                except (QuotaExhausted, TransportError) as error:
+                    print(f"Skipping a batch of the refresh: {error}")
+            writer.flush()
+            return writer.rows_written
@@ -0,0 +1,154 @@
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # orjson decodes API pages several times faster than the standard library, when it is installed.
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def decode_json(body):
+    """
+    Decode a JSON response body, with orjson when available and the json module otherwise.
+
+    Args:
+        body (bytes): The raw (already decompressed) response body.
+
+    Returns:
+        The decoded JSON value.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class TransportError(Exception):
+    """Raised when a request still fails after every retry has been used."""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        # Keep the last response (if any) so the caller can inspect the status and body.
+        self.response = response
+
+
+class ApiTransport:
+    """
+    A small HTTP layer shared by every request the scraper makes.
+
+    It keeps one `requests.Session` with a connection pool, so pages of the same region (and
+    concurrent regions) reuse their keep-alive TLS connections instead of opening a new one per call.
+    Responses are requested gzip-compressed, and rate limiting (HTTP 429) or server errors (5xx)
+    are retried with exponential backoff and jitter, honouring the `Retry-After` header when present.
+    """
+
+    # Status codes that are worth retrying: rate limiting and transient server errors.
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, pool_size=10, max_retries=5, backoff_factor=1.0, max_backoff=60.0, timeout=30):
+        # Number of retries allowed after the first attempt.
+        self.max_retries = max_retries
+        # Base delay in seconds, doubled on every retry.
+        self.backoff_factor = backoff_factor
+        # Upper bound for a single wait, whether computed or read from Retry-After.
+        self.max_backoff = max_backoff
+        # Seconds to wait for the server before giving up on a single attempt.
+        self.timeout = timeout
+
+        # One persistent session; the adapter keeps up to `pool_size` connections alive per host.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Google APIs only compress responses when both headers ask for gzip.
+        self.session.headers.update({"Accept-Encoding": "gzip",
+                                     "User-Agent": "youtube-views-scraper (gzip)"})
+
+    def backoff(self, attempt):
+        """
+        Compute the wait before the next retry using exponential backoff with full jitter.
+
+        Args:
+            attempt (int): Zero-based number of the attempt that just failed.
+
+        Returns:
+            float: Number of seconds to sleep.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def retry_after(self, response):
+        """
+        Read the `Retry-After` header of a response, which is either seconds or an HTTP date.
+
+        Args:
+            response (requests.Response): The rate limited or failed response.
+
+        Returns:
+            float or None: Number of seconds to sleep, or None if the header is missing or invalid.
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return min(self.max_backoff, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            return min(self.max_backoff, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, url, params=None, headers=None, retry_rate_limits=True, max_retries=None):
+        """
+        Send a GET request, retrying on connection errors, rate limiting and server errors.
+
+        Args:
+            url (str): The URL to request.
+            params (dict, optional): Query string parameters.
+            headers (dict, optional): Extra headers for this request only.
+            retry_rate_limits (bool, optional): Retry HTTP 429 here. Pass False when the caller would
+                rather switch to another API key at once. Defaults to True.
+            max_retries (int, optional): Retries allowed for this request; 0 makes a single attempt, for
+                callers that retry themselves. Defaults to None (the transport's max_retries).
+
+        Returns:
+            requests.Response: The first response whose status is not retryable.
+
+        Raises:
+            TransportError: If every attempt failed.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        response = None
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # Network problems are retried like server errors.
+                if attempt == max_retries:
+                    raise TransportError(f"Request failed after {attempt + 1} attempts: {error}") from error
+                time.sleep(self.backoff(attempt))
+                continue
+
+            # Anything that is not rate limiting or a server error goes straight back to the caller.
+            if response.status_code not in self.retry_statuses:
+                return response
+            if response.status_code == 429 and not retry_rate_limits:
+                return response
+            if attempt == max_retries:
+                break
+
+            # Prefer the delay the server asked for, and fall back to our own backoff.
+            delay = self.retry_after(response)
+            if delay is None:
+                delay = self.backoff(attempt)
+            print(f"HTTP {response.status_code} received, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1} of {max_retries})")
+            time.sleep(delay)
+
+        raise TransportError(f"HTTP {response.status_code} after {max_retries + 1} attempts", response)
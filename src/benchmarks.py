@@ -0,0 +1,117 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils import haversine_distance
+
+try:
+    # The row-by-row baseline uses the haversine package, as DataIngestion did before.
+    import haversine as hs
+    from haversine import Unit
+except ImportError:
+    hs = None
+
+# Number of rows of notebooks/data/finalTrain.csv
+FULL_DATASET_ROWS = 45584
+coordinate_columns = ['Restaurant_latitude', 'Restaurant_longitude',
+                      'Delivery_location_latitude', 'Delivery_location_longitude']
+
+
+def synthetic_coordinates(rows, seed=0):
+    """
+    Build restaurant and delivery coordinates shaped like the delivery dataset, for when finalTrain.csv
+    is not available: restaurants spread over India and deliveries within a few kilometers of them.
+
+    Args:
+        rows (int): Number of orders.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pandas.DataFrame: The four coordinate columns of the dataset.
+    """
+    rng = np.random.default_rng(seed)
+    latitude = rng.uniform(8.0, 31.0, rows)
+    longitude = rng.uniform(72.0, 89.0, rows)
+    return pd.DataFrame({
+        'Restaurant_latitude': latitude,
+        'Restaurant_longitude': longitude,
+        'Delivery_location_latitude': latitude + rng.uniform(-0.15, 0.15, rows),
+        'Delivery_location_longitude': longitude + rng.uniform(-0.15, 0.15, rows),
+    })
+
+
+def legacy_displacement(df, rows):
+    # The old path: two row lookups per coordinate pair and one haversine call per order.
+    distances = []
+    for i in range(rows):
+        loc1 = (df.loc[i].iloc[0], df.loc[i].iloc[1])
+        loc2 = (df.loc[i].iloc[2], df.loc[i].iloc[3])
+        distances.append(hs.haversine(loc1, loc2, unit=Unit.KILOMETERS))
+    return np.array(distances)
+
+
+def best_time(function, repeat):
+    # Fastest of several runs, with the result of the last one.
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def benchmark_haversine(rows=FULL_DATASET_ROWS, legacy_rows=2000, chunk_size=8192, repeat=3):
+    """
+    Compare the vectorized displacement of DataIngestion with the old row-by-row loop.
+
+    The loop takes minutes on the full dataset, so it is timed on the first `legacy_rows` orders and
+    projected to the full size; its distances are also used to check the vectorized ones.
+
+    Args:
+        rows (int, optional): Number of synthetic orders. Defaults to the size of finalTrain.csv.
+        legacy_rows (int, optional): Orders timed with the old loop. Defaults to 2000.
+        chunk_size (int, optional): Block size of the chunked mode. Defaults to 8192.
+        repeat (int, optional): Runs of the vectorized versions; the best one is kept. Defaults to 3.
+
+    Returns:
+        dict: Timings in seconds and the largest difference from the haversine package in kilometers.
+    """
+    df = synthetic_coordinates(rows)
+    columns = [df[name] for name in coordinate_columns]
+    vectorized_seconds, distances = best_time(lambda: haversine_distance(*columns), repeat)
+    chunked_seconds, chunked = best_time(lambda: haversine_distance(*columns, chunk_size=chunk_size), repeat)
+    report = {
+        "rows": rows,
+        "vectorized_seconds": round(vectorized_seconds, 4),
+        "chunked_seconds": round(chunked_seconds, 4),
+        "chunked_matches": bool(np.array_equal(distances, chunked)),
+    }
+    if hs is not None and legacy_rows:
+        legacy_rows = min(legacy_rows, rows)
+        started = time.perf_counter()
+        expected = legacy_displacement(df, legacy_rows)
+        legacy_seconds = time.perf_counter() - started
+        report.update({
+            "legacy_rows": legacy_rows,
+            "legacy_seconds": round(legacy_seconds, 3),
+            "legacy_projected_seconds": round(legacy_seconds * rows / legacy_rows, 1),
+            "max_difference_km": float(np.abs(distances[:legacy_rows] - expected).max()),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the training pipeline")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    haversine = subparsers.add_parser("haversine", help="Compare the vectorized and the row-by-row displacement")
+    haversine.add_argument("--rows", type=int, default=FULL_DATASET_ROWS)
+    haversine.add_argument("--legacy-rows", type=int, default=2000)
+    haversine.add_argument("--chunk-size", type=int, default=8192)
+    haversine.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.benchmark == "haversine":
+        print(benchmark_haversine(args.rows, args.legacy_rows, args.chunk_size, args.repeat))
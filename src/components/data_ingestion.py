@@ -1,8 +1,6 @@
 import os
 import sys
 import pandas as pd
-import haversine as hs
-from haversine import Unit
 from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 sys.path.append("./src")
@@ -10,6 +8,7 @@ from logger import logging
 from exception import CustomException
 
 from src.components.data_transformation import DataTransformation
+from src.utils import haversine_distance
 
 
 ## Intitialize the Data Ingetion Configuration
@@ -21,6 +20,10 @@ class DataIngestionconfig:
     train_data_path:str=os.path.join('artifacts','train.csv')
     test_data_path:str=os.path.join('artifacts','test.csv')
     raw_data_path:str=os.path.join('artifacts','raw.csv')
+    # Source file, share of the rows kept for testing, and the column identifying a row for the chunked split
+    source_data_path:str=os.path.join('notebooks/data','finalTrain.csv')
+    test_size:float=0.30
+    row_key:str='ID'
 
 ## create a class for Data Ingestion
 class DataIngestion:
@@ -30,46 +33,97 @@ class DataIngestion:
     def __init__(self):
         self.ingestion_config=DataIngestionconfig()
 
-    def initiate_data_ingestion(self):
-        logging.info('Data Ingestion methods Starts')
+    def prepare_features(self, df):
+        """The prepare_features method derives the Displacement feature from the coordinates and drops the columns
+           that are not used for training. It works the same on the whole dataset or on one chunk of it."""
+        logging.info("Process started of converting Longititude and Latitude into displacement of source and destination")
+
+        # Great-circle distance in kilometers between the restaurant and the delivery location,
+        # computed over the whole coordinate columns at once, whatever the number of rows
+        df['Displacement'] = haversine_distance(
+            df['Restaurant_latitude'], df['Restaurant_longitude'],
+            df['Delivery_location_latitude'], df['Delivery_location_longitude']
+        )
+        logging.info("Process ended of converting Longititude and Latitude into displacement of source and destination")
+
+        logging.info("Dropping unecessary data")
+        def drop_features(df, feature):
+             df = df.drop([feature], axis=1, inplace=True)
+             return df
+
+        drop_features(df, 'ID')
+        drop_features(df, 'Delivery_person_ID')
+        drop_features(df, 'Restaurant_latitude')
+        drop_features(df, 'Restaurant_longitude')
+        drop_features(df, 'Delivery_location_latitude')
+        drop_features(df, 'Delivery_location_longitude')
+        drop_features(df, 'Order_Date')
+        drop_features(df, 'Time_Orderd')
+        drop_features(df, 'Time_Order_picked')
+
+        return df
+
+    def hash_split(self, keys):
+        """The hash_split method takes the row keys of a chunk and returns a boolean array that is True for the rows
+           going to the test set. A row is assigned by a stable 64-bit hash of its key, so it always lands on the
+           same side, whatever the chunk it was read in or the number of runs."""
+        # Keys are hashed as text, since the same column can be parsed as numbers in one chunk and text in another
+        hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+        return (hashes % 10000) < int(self.ingestion_config.test_size * 10000)
+
+    def initiate_chunked_data_ingestion(self, chunksize=100000):
+        """The initiate_chunked_data_ingestion method streams the source CSV in chunks of chunksize rows instead of reading
+           it whole. Each chunk gets its features prepared, its rows assigned to train or test by hash_split, and is
+           appended to the raw, train and test files, so memory use depends on the chunk size and not on the size of the
+           source. The files are written under temporary names and moved into place at the end, so a failed run never
+           leaves half-written artifacts behind."""
+        logging.info(f'Chunked Data Ingestion starts with chunks of {chunksize} rows')
         try:
-            # Read the data using the pandas
-            df=pd.read_csv(os.path.join('notebooks/data','finalTrain.csv'))
-            logging.info('Dataset read as pandas Dataframe')
-
-            logging.info("Process started of converting Longititude and Latitude into displacement of source and destination")
- 
-            list_1 = []
-
-            def displacement(i):
-                 loc1 = (df.loc[i][4], df.loc[i][5])
-                 loc2 = (df.loc[i][6], df.loc[i][7])
-                 list_1.append(hs.haversine(loc1,loc2, unit=Unit.KILOMETERS))
+            paths = {
+                'raw': self.ingestion_config.raw_data_path,
+                'train': self.ingestion_config.train_data_path,
+                'test': self.ingestion_config.test_data_path,
+            }
+            temp_paths = {name: f"{path}.tmp" for name, path in paths.items()}
+            for path in paths.values():
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            rows = {name: 0 for name in paths}
+            for number, chunk in enumerate(pd.read_csv(self.ingestion_config.source_data_path, chunksize=chunksize)):
+                # The key is dropped with the other unused columns, so the split is decided first
+                test_rows = self.hash_split(chunk[self.ingestion_config.row_key])
+                chunk = self.prepare_features(chunk)
+                parts = {'raw': chunk, 'train': chunk[~test_rows], 'test': chunk[test_rows]}
+                for name, part in parts.items():
+                    # The first chunk creates the files with the header, the next ones are appended
+                    part.to_csv(temp_paths[name], mode='w' if number == 0 else 'a', header=number == 0, index=False)
+                    rows[name] += len(part)
+
+            for name, path in paths.items():
+                os.replace(temp_paths[name], path)
+            logging.info(f"Chunked Data Ingestion is completed: {rows['train']} train rows, {rows['test']} test rows")
 
-            for i in range(0, 45584):
-                displacement(i)
-
-            df['Displacement'] = pd.DataFrame(list_1)
-            logging.info("Process ended of converting Longititude and Latitude into displacement of source and destination")
+            return(
+                self.ingestion_config.train_data_path,
+                self.ingestion_config.test_data_path
+            )
 
-            
+        except Exception as e:
+            logging.info('Exception occured at Data Ingestion stage')
+            raise CustomException(e,sys)
 
-            logging.info("Dropping unecessary data")
-            def drop_features(df, feature):
-                 df = df.drop([feature], axis=1, inplace=True)
-                 return df
-            
-            drop_features(df, 'ID')
-            drop_features(df, 'Delivery_person_ID')
-            drop_features(df, 'Restaurant_latitude')
-            drop_features(df, 'Restaurant_longitude')
-            drop_features(df, 'Delivery_location_latitude')
-            drop_features(df, 'Delivery_location_longitude')
-            drop_features(df, 'Order_Date')
-            drop_features(df, 'Time_Orderd')
-            drop_features(df, 'Time_Order_picked')
-            
+    def initiate_data_ingestion(self, chunksize=None):
+        """Ingest the source file in memory, or in chunks of chunksize rows when chunksize is given
+           (see initiate_chunked_data_ingestion)."""
+        logging.info('Data Ingestion methods Starts')
+        if chunksize:
+            return self.initiate_chunked_data_ingestion(chunksize)
+        try:
+            # Read the data using the pandas
+            df=pd.read_csv(self.ingestion_config.source_data_path)
+            logging.info('Dataset read as pandas Dataframe')
 
+            df = self.prepare_features(df)
             logging.info(f"Data frame: \n{df.head().to_string()}")
 
 
@@ -79,7 +133,7 @@ class DataIngestion:
 
             logging.info('Train and test and split the data')
             # Split the train and test data
-            train_set,test_set=train_test_split(df,test_size=0.30,random_state=42)
+            train_set,test_set=train_test_split(df,test_size=self.ingestion_config.test_size,random_state=42)
 
             # Seving the train and test data
             train_set.to_csv(self.ingestion_config.train_data_path,index=False,header=True)
@@ -5,11 +5,12 @@ import pandas as pd
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OrdinalEncoder,StandardScaler
+from sklearn.preprocessing import OrdinalEncoder,StandardScaler,OneHotEncoder,FunctionTransformer
 from src.exception import CustomException
 from src.logger import logging
 import os
-from src.utils import save_object
+import pickle
+from src.utils import save_object, load_object, hash_inputs, save_array, load_array
 
 
 @dataclass
@@ -18,9 +19,14 @@ class DataTransformationConfig:
        to a file path in the artifacts directory where the preprocessor object will be saved as a pickle file"""
     
     preprocessor_obj_file_path=os.path.join('artifacts','preprocessor.pkl')
+    # Transformed train and test matrices, cached as float32 .npy files in one folder per hash of the inputs
+    feature_cache_dir=os.path.join('artifacts','feature_cache')
 
 class DataTransformation:
 
+    # Selecting the data to target for prediction.
+    target_column_name = 'Time_taken (min)'
+
     def __init__(self):
         self.data_transformation_config=DataTransformationConfig()
 
@@ -74,6 +80,34 @@ class DataTransformation:
         
     def initaite_data_transformation(self,train_path,test_path):
         try:
+            logging.info('Obtaining preprocessing object')
+            # making a object get_data_transformation_object()
+            preprocessing_obj = self.get_data_transformation_object()
+
+            target_column_name = self.target_column_name
+
+            # The cached matrices are only valid for the same train and test files, the same (unfitted) preprocessor
+            # configuration and sklearn version (both captured by its pickle), and the same target column.
+            cache_key = hash_inputs([train_path, test_path],
+                                    config=pickle.dumps(preprocessing_obj) + target_column_name.encode('utf-8'))
+            cache_dir = os.path.join(self.data_transformation_config.feature_cache_dir, cache_key)
+            train_cache_path = os.path.join(cache_dir, 'train.npy')
+            test_cache_path = os.path.join(cache_dir, 'test.npy')
+            preprocessor_cache_path = os.path.join(cache_dir, 'preprocessor.pkl')
+
+            if all(os.path.exists(path) for path in (train_cache_path, test_cache_path, preprocessor_cache_path)):
+                logging.info(f'Feature cache {cache_key} is valid, skipping the transformation')
+                # The artifact preprocessor must be the one the cached matrices were built with.
+                save_object(
+                    file_path=self.data_transformation_config.preprocessor_obj_file_path,
+                    obj=load_object(preprocessor_cache_path)
+                )
+                return (
+                    load_array(train_cache_path),
+                    load_array(test_cache_path),
+                    self.data_transformation_config.preprocessor_obj_file_path,
+                )
+
             # Reading train and test data
             train_df = pd.read_csv(train_path)
             test_df = pd.read_csv(test_path)
@@ -82,21 +116,15 @@ class DataTransformation:
             logging.info(f'Train Dataframe Head : \n{train_df.head().to_string()}')
             logging.info(f'Test Dataframe Head  : \n{test_df.head().to_string()}')
 
-            logging.info('Obtaining preprocessing object')
-            # making a object get_data_transformation_object()
-            preprocessing_obj = self.get_data_transformation_object()
-
-            # Selecting the data to target for prediction.
-            target_column_name = 'Time_taken (min)'
             # Selecting the data to drop. This data is not correlated with what I want to predict
             drop_columns = [target_column_name]
 
             # This code is preparing the training data by selecting the input features and target feature from the train Dataframe. 
-            input_feature_train_df = train_df.drop(columns=drop_columns,axis=1)
+            input_feature_train_df = train_df.drop(columns=drop_columns)
             target_feature_train_df=train_df[target_column_name]
 
             # This code is preparing the testing data by selecting the input features and target feature from the test Dataframe.
-            input_feature_test_df=test_df.drop(columns=drop_columns,axis=1)
+            input_feature_test_df=test_df.drop(columns=drop_columns)
             target_feature_test_df=test_df[target_column_name]
             
             ## Trnasformating using preprocessor object
@@ -105,11 +133,23 @@ class DataTransformation:
 
             logging.info("Applying preprocessing object on training and testing datasets.")
 
-            """This code combines the input featureS array and target featureS array horizontally using NumPy's np.c_ method,
-              creating the final training and testing arrays for the machine learning model."""
-            
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            """This code combines the input features array and target feature array horizontally into one float32 matrix
+              (features first, target in the last column), creating the final training and testing arrays for the
+              machine learning model. They are written to the feature cache and opened memory-mapped, so repeat runs
+              and parallel model fits share the same pages instead of each holding a copy."""
+
+            train_arr = np.empty((input_feature_train_arr.shape[0], input_feature_train_arr.shape[1] + 1), dtype=np.float32)
+            train_arr[:, :-1] = input_feature_train_arr
+            train_arr[:, -1] = np.asarray(target_feature_train_df, dtype=np.float32)
+            test_arr = np.empty((input_feature_test_arr.shape[0], input_feature_test_arr.shape[1] + 1), dtype=np.float32)
+            test_arr[:, :-1] = input_feature_test_arr
+            test_arr[:, -1] = np.asarray(target_feature_test_df, dtype=np.float32)
+
+            save_array(train_cache_path, train_arr)
+            save_array(test_cache_path, test_arr)
+            # The cached preprocessor is written last, so the cache only counts as valid once everything is there
+            save_object(file_path=preprocessor_cache_path, obj=preprocessing_obj)
+            logging.info(f'Feature matrices cached as {cache_key}')
 
             save_object(
 
@@ -120,8 +160,8 @@ class DataTransformation:
             logging.info('Preprocessor pickle file saved')
 
             return (
-                train_arr,
-                test_arr,
+                load_array(train_cache_path),
+                load_array(test_cache_path),
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
             
@@ -132,9 +172,70 @@ class DataTransformation:
         
 
 
+@dataclass
+class ViewsDataTransformationConfig(DataTransformationConfig):
+    """The ViewsDataTransformationConfig class keeps the preprocessor and the feature cache of the views model in
+       artifacts/views, next to the files written by YoutubeDataIngestion."""
 
+    preprocessor_obj_file_path=os.path.join('artifacts','views','preprocessor.pkl')
+    feature_cache_dir=os.path.join('artifacts','views','feature_cache')
 
+class ViewsDataTransformation(DataTransformation):
+    """The ViewsDataTransformation class preprocesses the YouTube trending data written by YoutubeDataIngestion,
+       with view_count as the target; the transformation itself (and its feature cache) is the one of DataTransformation."""
 
+    target_column_name = 'view_count'
 
+    def __init__(self):
+        self.data_transformation_config=ViewsDataTransformationConfig()
 
+    def get_data_transformation_object(self):
+        try:
+            logging.info('Views Data Transformation initiated')
+
+            # Counts span several orders of magnitude, so they are log-scaled before being standardized
+            count_columns = ['likes', 'dislikes', 'comment_count']
+            numerical_columns = ['days_to_trend', 'publish_hour', 'title_length', 'tag_count',
+                                 'comments_disabled', 'ratings_disabled']
+            # Category ids have no order, so each one gets its own column
+            categorical_columns = ['categoryId']
+
+            logging.info('Pipeline Initiated')
+
+            ## Creating the Count Pipeline
+            count_pipeline = Pipeline(
+                steps=[
+                ('imputer', SimpleImputer(strategy='median')),
+                ('log', FunctionTransformer(np.log1p)),
+                ('scaler', StandardScaler())
+                ]
+            )
 
+            ## Creating the Numerical Pipeline
+            num_pipeline = Pipeline(
+                steps=[
+                ('imputer', SimpleImputer(strategy='median')),
+                ('scaler', StandardScaler())
+                ]
+            )
+
+            # Creating the Categorigal Pipeline
+            cat_pipeline = Pipeline(
+                steps=[
+                ('imputer', SimpleImputer(strategy='most_frequent')),
+                ('onehotencoder', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+                ]
+            )
+
+            # Creating the preprocessor
+            preprocessor = ColumnTransformer([
+                ('count_pipeline', count_pipeline, count_columns),
+                ('num_pipeline', num_pipeline, numerical_columns),
+                ('cat_pipeline', cat_pipeline, categorical_columns)
+            ])
+
+            logging.info('Pipeline Completed')
+            return preprocessor
+        except Exception as e:
+            logging.info("Error in Views Data Transformation")
+            raise CustomException(e,sys)
@@ -5,6 +5,7 @@ from src.logger import logging
 from src.utils import save_object
 from dataclasses import dataclass
 from src.utils import evaluate_model
+from src.utils import load_array
 from src.exception import CustomException
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression, Ridge,Lasso,ElasticNet
@@ -22,6 +23,13 @@ class ModelTrainer:
 
     def initate_model_training(self,train_array,test_array):
         try:
+            # The train and test matrices can also be given as paths of cached .npy files, which are opened
+            # memory-mapped (np.load with mmap_mode='r') so parallel model fits share the pages instead of copying
+            if isinstance(train_array, (str, os.PathLike)):
+                train_array = load_array(train_array)
+            if isinstance(test_array, (str, os.PathLike)):
+                test_array = load_array(test_array)
+
             # This code is splitting the train and test data arrays into input features and target features for both train and test datasets
             logging.info('Splitting Dependent and Independent variables from train and test data')
             X_train, y_train, X_test, y_test = (
@@ -72,3 +80,15 @@ class ModelTrainer:
             raise CustomException(e,sys)
         
 
+
+@dataclass
+class ViewsModelTrainerConfig(ModelTrainerConfig):
+    # seving the views model next to the other artifacts of the views model
+    trained_model_file_path = os.path.join('artifacts','views','model.pkl')
+
+
+class ViewsModelTrainer(ModelTrainer):
+    """The ViewsModelTrainer class trains the same candidate models on the YouTube trending data and saves the
+       best one as the views model."""
+    def __init__(self):
+        self.model_trainer_config = ViewsModelTrainerConfig()
@@ -0,0 +1,107 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from src.logger import logging
+from src.exception import CustomException
+
+from src.components.data_ingestion import DataIngestion, DataIngestionconfig
+
+# The snapshot loaders live next to the scraper in notebooks/data, which is not a package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'notebooks', 'data'))
+from loading import elist
+
+
+## Intitialize the YouTube Data Ingetion Configuration
+
+@dataclass
+class YoutubeDataIngestionconfig(DataIngestionconfig):
+    """The YoutubeDataIngestionconfig class keeps the contract of DataIngestionconfig (train, test and raw file paths,
+       test share and split key) with the artifacts of the views model in artifacts/views, and points at the folder
+       of trending snapshots written by the scraper (flat or partitioned, CSV or Parquet)."""
+    train_data_path:str=os.path.join('artifacts','views','train.csv')
+    test_data_path:str=os.path.join('artifacts','views','test.csv')
+    raw_data_path:str=os.path.join('artifacts','views','raw.csv')
+    source_data_path:str='output'
+    # Videos trend for several days, so the split is made by video: all the days of a video land on the same side
+    row_key:str='video_id'
+    # Number of reader processes, None for the CPU count
+    max_workers:int=None
+
+## create a class for YouTube Data Ingestion
+class YoutubeDataIngestion(DataIngestion):
+    """The YoutubeDataIngestion class reads the trending snapshots instead of finalTrain.csv: it loads only the needed
+       columns of every snapshot in parallel with pinned types, keeps one row per video and trending date, derives the
+       features of the views model with view_count as the target, and writes the raw, train and test files like
+       DataIngestion does."""
+
+    # Snapshot columns read; every other column (descriptions, thumbnails, channel names) is never parsed
+    snapshot_columns = ['video_id', 'trending_date', 'title', 'publishedAt', 'categoryId', 'tags', 'view_count',
+                        'likes', 'dislikes', 'comment_count', 'comments_disabled', 'ratings_disabled']
+
+    def __init__(self):
+        self.ingestion_config=YoutubeDataIngestionconfig()
+
+    def prepare_features(self, df):
+        """The prepare_features method derives the features of the views model from the snapshot columns and drops
+           the columns that are not used for training, leaving view_count as the target."""
+        logging.info("Deriving the features of the views model")
+
+        # Days between the upload and the trending date, and the hour (UTC) the video was published at
+        trending = pd.to_datetime(df['trending_date'].astype(str), format='%y.%d.%m')
+        published = pd.to_datetime(df['publishedAt'].astype(str), utc=True, errors='coerce').dt.tz_localize(None)
+        df['days_to_trend'] = (trending - published).dt.total_seconds() / 86400
+        df['publish_hour'] = published.dt.hour
+
+        # Length of the title and number of tags ("[none]" when the video has no tag)
+        df['title_length'] = df['title'].astype(str).str.len()
+        tags = df['tags'].astype(str)
+        df['tag_count'] = np.where(tags.isin(['[none]', '', 'nan', '<NA>']), 0, tags.str.count(r'\|') + 1)
+
+        # Flags become 0 and 1
+        for flag in ['comments_disabled', 'ratings_disabled']:
+            df[flag] = df[flag].astype(str).eq('True').astype(int)
+
+        logging.info("Dropping unecessary data")
+        df = df.drop(columns=['video_id', 'trending_date', 'title', 'publishedAt', 'tags'])
+
+        # The target goes last
+        return df[[name for name in df.columns if name != 'view_count'] + ['view_count']]
+
+    def initiate_data_ingestion(self):
+        logging.info('YouTube Data Ingestion methods Starts')
+        try:
+            config = self.ingestion_config
+
+            # Read the selected columns of every snapshot in parallel, with integer counts and categorical ids
+            df = elist(config.source_data_path, columns=self.snapshot_columns, max_workers=config.max_workers)
+            logging.info(f'{len(df)} snapshot rows read as pandas Dataframe')
+
+            # A video trending in several regions on the same day is one observation, and rows without
+            # a view count (hidden counters) have no target
+            df = df.drop_duplicates(subset=['video_id', 'trending_date'], keep='first')
+            df = df[df['view_count'].notna()].reset_index(drop=True)
+            logging.info(f'{len(df)} rows after removing duplicated (video_id, trending_date) pairs')
+
+            # The split key is dropped with the other unused columns, so the split is decided first
+            test_rows = self.hash_split(df[config.row_key])
+            df = self.prepare_features(df)
+            logging.info(f"Data frame: \n{df.head().to_string()}")
+
+            # Seving the raw, train and test data
+            os.makedirs(os.path.dirname(config.raw_data_path),exist_ok=True)
+            df.to_csv(config.raw_data_path,index=False)
+            df[~test_rows].to_csv(config.train_data_path,index=False,header=True)
+            df[test_rows].to_csv(config.test_data_path,index=False,header=True)
+
+            logging.info('Ingestion of YouTube Data is completed')
+
+            return(
+                config.train_data_path,
+                config.test_data_path
+            )
+
+        except Exception as e:
+            logging.info('Exception occured at YouTube Data Ingestion stage')
+            raise CustomException(e,sys)
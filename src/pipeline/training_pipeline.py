@@ -5,26 +5,22 @@ from src.logger import logging
 from src.exception import CustomException
 
 from src.components.data_ingestion import DataIngestion
-from src.components.data_transformation import DataTransformation
-from src.components.model_trainer import ModelTrainer
+from src.components.data_transformation import DataTransformation, ViewsDataTransformation
+from src.components.model_trainer import ModelTrainer, ViewsModelTrainer
+from src.components.youtube_data_ingestion import YoutubeDataIngestion
 
 
 if __name__=='__main__':
-    obj=DataIngestion()
+    # python -m src.pipeline.training_pipeline views trains the views model on the scraped trending snapshots,
+    # without an argument the delivery time model is trained
+    if sys.argv[1:] == ['views']:
+        obj=YoutubeDataIngestion()
+        data_transformation = ViewsDataTransformation()
+        model_trainer=ViewsModelTrainer()
+    else:
+        obj=DataIngestion()
+        data_transformation = DataTransformation()
+        model_trainer=ModelTrainer()
     train_data_path,test_data_path=obj.initiate_data_ingestion()
-    data_transformation = DataTransformation()
     train_arr,test_arr,_=data_transformation.initaite_data_transformation(train_data_path,test_data_path)
-    model_trainer=ModelTrainer()
     model_trainer.initate_model_training(train_arr,test_arr)
-
-
-
-
-
-
-
-
-
-
-
-
@@ -1,7 +1,9 @@
 import os
 import sys
 import pickle
+import hashlib
 
+import numpy as np
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 
 from src.exception import CustomException
@@ -59,11 +61,75 @@ def load_object(file_path):
         logging.info('Exception Occured in load_object function utils')
         raise CustomException(e,sys)
 
-    
 
+def hash_inputs(file_paths, config=""):
+    """The hash_inputs function takes a list of file paths and a configuration (str or bytes) as inputs, reads the files
+        in chunks, and returns a SHA-256 hex digest of their contents and the configuration, so cached results
+        can be reused only while neither the data nor the configuration changed."""
+    try:
+        digest = hashlib.sha256()
+        for file_path in file_paths:
+            with open(file_path, "rb") as file_obj:
+                for chunk in iter(lambda: file_obj.read(1 << 20), b""):
+                    digest.update(chunk)
+            # Separate the files, so moving bytes from one file to the next changes the hash
+            digest.update(b"\0")
+        digest.update(config if isinstance(config, bytes) else config.encode("utf-8"))
+        return digest.hexdigest()
+
+    except Exception as e:
+        logging.info('Exception Occured in hash_inputs function utils')
+        raise CustomException(e,sys)
+
+
+def save_array(file_path, array):
+    """The save_array function takes a file path and a NumPy array as inputs, writes the array as a .npy file
+        under a temporary name and then moves it into place, so readers never open a half-written file."""
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, "wb") as file_obj:
+            np.save(file_obj, array)
+        os.replace(temp_path, file_path)
+
+    except Exception as e:
+        logging.info('Exception Occured in save_array function utils')
+        raise CustomException(e,sys)
 
 
+def load_array(file_path):
+    """The load_array function takes the path of a .npy file and opens it memory-mapped and read-only, so the
+        operating system pages the data in on demand and every process reading the file shares the same pages."""
+    try:
+        return np.load(file_path, mmap_mode='r')
+    except Exception as e:
+        logging.info('Exception Occured in load_array function utils')
+        raise CustomException(e,sys)
 
 
+# Mean Earth radius in kilometers, the same value the haversine package uses
+EARTH_RADIUS_KM = 6371.0088
 
 
+def haversine_distance(lat1, lon1, lat2, lon2, chunk_size=None):
+    """The haversine_distance function takes the latitudes and longitudes of the start and end points (columns,
+        arrays or lists of any length) and returns the great-circle distance between each pair in kilometers as a
+        NumPy array. The formula is applied to whole columns at once instead of one row at a time; with chunk_size
+        the rows are processed in blocks of that many, so the temporary arrays stay small for huge inputs."""
+    try:
+        lat1, lon1, lat2, lon2 = (np.asarray(values, dtype=np.float64) for values in (lat1, lon1, lat2, lon2))
+        distance = np.empty(lat1.shape, dtype=np.float64)
+        step = chunk_size or max(len(lat1), 1)
+        for start in range(0, len(lat1), step):
+            rows = slice(start, start + step)
+            phi1 = np.radians(lat1[rows])
+            phi2 = np.radians(lat2[rows])
+            half_dphi = np.sin((phi2 - phi1) * 0.5)
+            half_dlambda = np.sin(np.radians(lon2[rows] - lon1[rows]) * 0.5)
+            a = half_dphi * half_dphi + np.cos(phi1) * np.cos(phi2) * half_dlambda * half_dlambda
+            distance[rows] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return distance
+
+    except Exception as e:
+        logging.info('Exception Occured in haversine_distance function utils')
+        raise CustomException(e,sys)